@@ -56,39 +56,15 @@ def _(mo, rcra_con):
 
 @app.cell
 def _(mo, rcra_con):
-    # Find domain information from handler contacts
+    # Handler/domain pairs from current contact emails and every certification email,
+    # current record or not (handler_domain is built by the gov_data ETL, sorted + indexed on domain)
     rcra_domains = mo.sql(
         """
-        WITH handler_emails AS (
-            SELECT DISTINCT 
-                handler_id,
-                contact_email_address as email
-            FROM HD_HANDLER 
-            WHERE current_record = 'Y'
-            AND contact_email_address IS NOT NULL
-            AND contact_email_address != ''
-            AND contact_email_address LIKE '%@%'
-        ),
-        cert_emails AS (
-            SELECT DISTINCT
-                handler_id,
-                cert_email as email
-            FROM HD_CERTIFICATION
-            WHERE cert_email IS NOT NULL
-            AND cert_email != ''
-            AND cert_email LIKE '%@%'
-        ),
-        all_emails AS (
-            SELECT * FROM handler_emails
-            UNION 
-            SELECT * FROM cert_emails
-        )
         SELECT DISTINCT
             handler_id,
-            split_part(email, '@', 2) as contact_domain
-        FROM all_emails
-        WHERE split_part(email, '@', 2) != ''
-        AND split_part(email, '@', 2) IS NOT NULL
+            domain as contact_domain
+        FROM handler_domain
+        WHERE source_table IN ('HD_HANDLER', 'HD_CERTIFICATION')
         ORDER BY contact_domain
         """,
         engine=rcra_con
@@ -137,18 +113,21 @@ def _(mo, prospect_domain, domain_dropdown):
 
 
 @app.cell
-def _(prospect_domain, domain_dropdown, rcra_domains, rcra_con):
+def _(prospect_domain, domain_dropdown, rcra_con):
     # Filter handlers by domain - dropdown overrides text input
     selected_domain = domain_dropdown.value if domain_dropdown.value else prospect_domain.value
     
     if selected_domain:
         target_domain = selected_domain.upper().strip()
         
-        # Filter the domains data using polars syntax
-        filtered_handlers = (
-            rcra_domains
-            .filter(rcra_domains['contact_domain'].str.to_uppercase() == target_domain)
-        )
+        # Indexed lookup on handler_domain instead of filtering the full frame
+        filtered_handlers = rcra_con.execute(
+            """
+            SELECT DISTINCT handler_id FROM handler_domain
+            WHERE domain = lower(?) AND source_table IN ('HD_HANDLER', 'HD_CERTIFICATION')
+            """,
+            [target_domain],
+        ).pl()
         
         # Register with DuckDB for further queries
         rcra_con.register("target_handlers", filtered_handlers.select("handler_id"))
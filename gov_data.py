@@ -7,217 +7,59 @@ app = marimo.App(width="columns", layout_file="layouts/gov_data.grid.json")
 @app.cell(column=0)
 def _():
     import marimo as mo
-    import os, re, shutil, zipfile, requests, duckdb, logging
-    from pathlib import Path
-    from datetime import datetime, timedelta
-    from tqdm.auto import tqdm
-    return (
-        Path,
-        datetime,
-        duckdb,
-        logging,
-        mo,
-        re,
-        requests,
-        shutil,
-        timedelta,
-        tqdm,
-        zipfile,
-    )
+    import duckdb, logging
+    return duckdb, logging, mo
 
 
 @app.cell
-def _(Path, logging):
+def _(logging):
     # ────────────────────────────────
-    # Basic settings
+    # Basic settings + ETL (utils/gov_etl)
     # ────────────────────────────────
-    DATA_ROOT      = Path("~/data").expanduser()
-    DB_ROOT      = Path("~/db").expanduser()
-    RAW_DATA_DIR   = DATA_ROOT / "gov_raw"
-    RCRA_DB_PATH   = DB_ROOT / "rcrainfo.duckdb"
-    ECHO_DB_PATH   = DB_ROOT / "echo.duckdb"
-
-    RCRA_DATASETS = {
-        "hd":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Handler/HD.zip",
-        "ce":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Compliance,%20Monitoring%20and%20Enforcement/CE.zip",
-        "ca":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Corrective%20Action/CA.zip",
-        "br":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Biennial%20Report/BR.zip",
-        "em":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/eManifest/EM.zip",
-        "fa":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Financial%20Assurance/FA.zip",
-        "pm":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Permitting/PM.zip"
-    }
-
-    ECHO_DATASETS = {
-        "air":      "https://echo.epa.gov/files/echodownloads/ICIS-AIR_downloads.zip",
-        "water":    "https://echo.epa.gov/files/echodownloads/npdes_downloads.zip",
-        "rcra":     "https://echo.epa.gov/files/echodownloads/rcra_downloads.zip",
-        "rcra_viol":"https://echo.epa.gov/files/echodownloads/pipeline_rcra_downloads.zip", 
-        "frs":      "https://ordsext.epa.gov/FLA/www3/state_files/national_combined.zip"
-    }
-
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
-    log = logging.getLogger("etl")
-    return (
+    from utils.gov_etl import (
         DB_ROOT,
         ECHO_DATASETS,
-        ECHO_DB_PATH,
-        RAW_DATA_DIR,
         RCRA_DATASETS,
-        RCRA_DB_PATH,
         log,
+        run_all,
     )
 
-
-@app.cell
-def _(
-    ECHO_DATASETS,
-    ECHO_DB_PATH,
-    Path,
-    RAW_DATA_DIR,
-    RCRA_DATASETS,
-    RCRA_DB_PATH,
-    datetime,
-    duckdb,
-    log,
-    re,
-    requests,
-    shutil,
-    timedelta,
-    tqdm,
-    zipfile,
-):
-    # ────────────────────────────────
-    # Helpers
-    # ────────────────────────────────
-    def latest_monday_stamp() -> str:
-        monday = datetime.now() - timedelta(days=datetime.now().weekday())
-        return monday.strftime("%Y-%m-%dT03-00-00-0400")
-
-    def download(url: str, to: Path, chunk=8192) -> Path:
-        to.parent.mkdir(parents=True, exist_ok=True)
-        r = requests.get(url, stream=True)
-        r.raise_for_status()
-        total = int(r.headers.get("content-length", 0))
-        with tqdm(total=total, unit="B", unit_scale=True, desc=to.name) as bar, open(to, "wb") as f:
-            for blk in r.iter_content(chunk):
-                if blk:
-                    f.write(blk); bar.update(len(blk))
-        return to
-
-    def unzip_recursive(zfile: Path, dest: Path):
-        dest.mkdir(parents=True, exist_ok=True)
-        with zipfile.ZipFile(zfile) as z:
-            z.extractall(dest)
-        for p in dest.rglob("*.zip"):
-            subdir = p.with_suffix('')
-            unzip_recursive(p, subdir)
-            p.unlink()  # remove nested zip
-
-    def snake(name: str) -> str:
-        name = name.lower()
-        name = re.sub(r'[^a-z0-9]+', '_', name).strip('_')
-        return re.sub(r'_+', '_', name)
-
-    def load_csvs(con, csvs: list[Path], table: str, bar=None) -> int:
-        if not csvs:
-            return 0
-        cols = con.execute(
-            f"SELECT * FROM read_csv_auto('{csvs[0]}', ALL_VARCHAR=TRUE, header=True) LIMIT 0"
-        ).fetchdf().columns
-        rename = ", ".join(f'"{c}" AS {snake(c)}' for c in cols)
-        union  = " UNION ALL ".join(
-            f"SELECT {rename} FROM read_csv_auto('{f}', ALL_VARCHAR=TRUE, header=True)"
-            for f in csvs
-        )
-        con.execute(f"CREATE OR REPLACE TABLE {table} AS {union}")
-        if bar:
-            n = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-            bar.set_postfix_str(f"{table}  {n:,} rows")
-            bar.update(len(csvs))
-        return len(csvs)
-
-    # ────────────────────────────────
-    # RCRA ETL
-    # ────────────────────────────────
-    def run_etl(key: str, skip_download=False):
-        if key not in RCRA_DATASETS:
-            raise ValueError(f"Choose from {list(RCRA_DATASETS)}")
-
-        date   = latest_monday_stamp()
-        url    = RCRA_DATASETS[key].format(date=date)
-        raw    = RAW_DATA_DIR / key / date
-        zfile  = RAW_DATA_DIR / f"{key}.zip"
-
-        log.info(f"[{key}] snapshot {date}")
-
-        if not skip_download:
-            download(url, zfile)
-            if raw.exists(): shutil.rmtree(raw)
-            unzip_recursive(zfile, raw)
-            zfile.unlink()
-
-        targets = sorted([d for d in raw.iterdir() if d.is_dir()]) or [raw]
-
-        # compute total files once for the bar
-        total_files = sum(len(list(d.glob("*.csv"))) for d in targets)
-
-        with duckdb.connect(RCRA_DB_PATH) as con, tqdm(total=total_files, desc="Ingest", unit="file") as bar:
-            for d in targets:
-                csvs = list(d.glob("*.csv"))
-                name = d.name if d.is_dir() else key
-                load_csvs(con, csvs, name, bar)
-
-        log.info(f"✅  ETL done for '{key}' — {len(targets)} tables ingested")
-
-    # ────────────────────────────────
-    # ECHO ETL
-    # ────────────────────────────────
-    def run_echo_etl(dataset: str, skip_download=False):
-        if dataset not in ECHO_DATASETS:
-            raise ValueError(f"Choose from {list(ECHO_DATASETS)}")
-
-        url       = ECHO_DATASETS[dataset]
-        data_dir  = RAW_DATA_DIR / dataset
-        zip_path  = data_dir / f"{dataset}.zip"
-        extract   = data_dir / "extracted"
-
-        log.info(f"[{dataset}] ETL start")
-
-        if not skip_download:
-            download(url, zip_path)
-        elif not zip_path.exists():
-            raise FileNotFoundError(zip_path)
-
-        if extract.exists(): shutil.rmtree(extract)
-        unzip_recursive(zip_path, extract)
-
-        csvs = list(extract.rglob("*.csv")) + list(extract.rglob("*.CSV"))
-        log.info(f"📋 Found {len(csvs)} CSV files")
-
-        total_files = len(csvs)
-
-        with duckdb.connect(ECHO_DB_PATH) as con, tqdm(total=total_files, desc="Ingest", unit='file') as bar:
-            for csv in csvs:
-                table = f"{snake(csv.stem)}"
-                load_csvs(con, [csv], table, bar)
-
-        log.info(f"✅  ETL done – {len(csvs)} tables, DB → {ECHO_DB_PATH.resolve()}")
-    return run_echo_etl, run_etl
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    return DB_ROOT, ECHO_DATASETS, RCRA_DATASETS, log, run_all
 
 
 @app.cell
 def _(mo):
     dataset_selector = mo.ui.dropdown(
-        options=list(['rcrainfo', 'echo+frs']),
+        options=list(['rcrainfo', 'echo+frs', 'all']),
         value='rcrainfo',
         label="Select Dataset to ETL"
     )
 
+    etl_workers = mo.ui.slider(1, 8, value=4, label="Parallel downloads")
+
+    etl_stream = mo.ui.checkbox(value=False, label="Stream CSVs from zip (no unzip)")
+
+    etl_force = mo.ui.checkbox(value=False, label="Force full reload")
+
+    etl_typed = mo.ui.checkbox(value=False, label="Typed columns (dates/amounts)")
+
+    # e.g. 4GB on an 8 GB laptop for EM/BR; blank = DuckDB default
+    etl_memory = mo.ui.text(value="", placeholder="e.g. 4GB", label="DuckDB memory limit")
+
     run_etl_button = mo.ui.run_button(label="Run ETL")
 
-    mo.hstack([dataset_selector, run_etl_button])
+    mo.hstack([dataset_selector, etl_workers, etl_stream, etl_force, etl_typed, etl_memory, run_etl_button])
 
-    return dataset_selector, run_etl_button
+    return (
+        dataset_selector,
+        etl_force,
+        etl_memory,
+        etl_stream,
+        etl_typed,
+        etl_workers,
+        run_etl_button,
+    )
 
 
 @app.cell
@@ -225,30 +67,44 @@ def _(
     ECHO_DATASETS,
     RCRA_DATASETS,
     dataset_selector,
+    etl_force,
+    etl_memory,
+    etl_stream,
+    etl_typed,
+    etl_workers,
     log,
-    run_echo_etl,
-    run_etl,
+    run_all,
     run_etl_button,
 ):
+    etl_results = None
     if run_etl_button.value:
+        _opts = dict(
+            workers=etl_workers.value,
+            stream=etl_stream.value,
+            incremental=not etl_force.value,  # etl_manifest skips unchanged sources/tables
+            typed=etl_typed.value,
+            memory_limit=etl_memory.value.strip() or None,
+        )
         if dataset_selector.value == 'rcrainfo':
-            # Assuming 'rcra_datasets' is a list of all RCRA dataset identifiers
-            for dataset_name in RCRA_DATASETS.keys():
-                run_etl(dataset_name)
+            etl_results = run_all(rcra=RCRA_DATASETS, **_opts)
         elif dataset_selector.value == 'echo+frs':
-            # Assuming 'echo_databases' is a list of all ECHO database identifiers
-            for dataset_name in ECHO_DATASETS.keys():
-                run_echo_etl(dataset_name)
+            etl_results = run_all(echo=ECHO_DATASETS, **_opts)
+        elif dataset_selector.value == 'all':
+            # rcrainfo.duckdb and echo.duckdb each get their own writer
+            etl_results = run_all(rcra=RCRA_DATASETS, echo=ECHO_DATASETS, **_opts)
         else:
-            # For any other specific dataset selection, run ETL for that dataset
             log.info(f"None - try again")
-    return
+    return (etl_results,)
 
 
 @app.cell
-def _(DB_ROOT, duckdb):
-    rcra_con = duckdb.connect(database= DB_ROOT / "rcrainfo.duckdb")
-    echo_con = duckdb.connect(database= DB_ROOT / "echo.duckdb")
+def _(DB_ROOT, duckdb, etl_results):
+    # read-only: the ETL writes into a new snapshot and swaps the symlink,
+    # so re-running this cell (after etl_results changes) picks up the new data.
+    # resolve() so DuckDB doesn't hand back its cached handle on the old file.
+    etl_results
+    rcra_con = duckdb.connect(database= (DB_ROOT / "rcrainfo.duckdb").resolve(), read_only=True)
+    echo_con = duckdb.connect(database= (DB_ROOT / "echo.duckdb").resolve(), read_only=True)
 
     print("Tables in rcrainfo.duckdb:")
     print(rcra_con.execute("PRAGMA show_tables;").fetchdf())
@@ -258,6 +114,37 @@ def _(DB_ROOT, duckdb):
     return echo_con, rcra_con
 
 
+@app.cell
+def _(echo_con, mo, rcra_con):
+    # Per-stage ETL timings from etl_runs: each dataset's latest run next to
+    # the run before it, so a slow download/unzip/insert shows up week over week.
+    _stage_sql = """
+        WITH s AS (
+            SELECT run_id, dataset, stage, sum(seconds) AS seconds,
+                   sum(bytes) AS bytes, sum(rows) AS rows
+            FROM etl_runs GROUP BY ALL
+        ), r AS (
+            SELECT *, dense_rank() OVER (PARTITION BY dataset ORDER BY run_id DESC) AS age FROM s
+        )
+        SELECT cur.dataset, cur.stage, cur.run_id,
+               round(cur.seconds, 1)                                  AS seconds,
+               round(cur.bytes / nullif(cur.seconds, 0) / 2**20, 1)   AS mb_per_s,
+               round(cur.rows / nullif(cur.seconds, 0))               AS rows_per_s,
+               round(prev.seconds, 1)                                 AS prev_seconds,
+               round(100 * (cur.seconds / nullif(prev.seconds, 0) - 1)) AS pct_change
+        FROM r cur
+        LEFT JOIN r prev ON prev.dataset = cur.dataset AND prev.stage = cur.stage AND prev.age = 2
+        WHERE cur.age = 1
+        ORDER BY cur.dataset, cur.seconds DESC
+    """
+    _out = [mo.md("### ETL stage timings (latest vs previous run)")]
+    for _name, _con in (("rcrainfo", rcra_con), ("echo", echo_con)):
+        if _con.execute("SELECT 1 FROM duckdb_tables() WHERE table_name = 'etl_runs'").fetchone():
+            _out += [mo.md(f"**{_name}**"), mo.ui.table(_con.execute(_stage_sql).fetchdf(), selection=None)]
+    mo.vstack(_out)
+    return
+
+
 @app.cell(column=1)
 def _():
     return
@@ -266,201 +153,38 @@ def _():
 @app.cell
 def _(echo_con, rcra_con):
     import pandas as pd
+    from utils.gov_etl.profiling import email_columns
 
-    def find_email_columns(connection, db_name):
-        """Find all tables and columns that contain email addresses"""
-    
-        # Get all tables and their columns
-        tables_query = """
-        SELECT table_name, column_name, data_type
-        FROM information_schema.columns
-        WHERE table_schema = 'main'
-        ORDER BY table_name, column_name
-        """
-    
-        tables_info = connection.execute(tables_query).fetchdf()
-    
-        email_results = []
-    
-        print(f"\n🔍 Searching for emails in {db_name}...")
-    
-        for _, row in tables_info.iterrows():
-            table_name = row['table_name']
-            column_name = row['column_name']
-        
-            # Check if column contains any '@' symbols
-            try:
-                count_query = f"""
-                SELECT COUNT(*) as email_count
-                FROM {table_name}
-                WHERE {column_name} LIKE '%@%'
-                AND {column_name} IS NOT NULL
-                """
-            
-                result = connection.execute(count_query).fetchone()
-                email_count = result[0] if result else 0
-            
-                if email_count > 0:
-                    # Get some sample emails
-                    sample_query = f"""
-                    SELECT {column_name}
-                    FROM {table_name}
-                    WHERE {column_name} LIKE '%@%'
-                    AND {column_name} IS NOT NULL
-                    LIMIT 5
-                    """
-                    samples = connection.execute(sample_query).fetchdf()
-                
-                    email_results.append({
-                        'database': db_name,
-                        'table': table_name,
-                        'column': column_name,
-                        'email_count': email_count,
-                        'samples': samples[column_name].tolist()
-                    })
-                
-            except Exception as e:
-                # Skip columns that can't be queried (e.g., binary columns)
-                continue
-    
-        return email_results
-
-    # Search both databases
-    rcra_emails = find_email_columns(rcra_con, "rcrainfo")
-    echo_emails = find_email_columns(echo_con, "echo")
+    # one scan per table covering all its VARCHAR columns; cached per snapshot
+    # file, so this is instant until the ETL publishes a new snapshot
+    _profiles = email_columns(rcra_con, "rcrainfo", workers=4) + email_columns(echo_con, "echo", workers=4)
 
-    # Combine results
-    all_email_results = rcra_emails + echo_emails
-
-    # Convert to DataFrame and sort by email count descending
-    email_df = pd.DataFrame(all_email_results)
+    # Keep columns that hold emails, sorted by email count descending
+    email_df = pd.DataFrame([_p for _p in _profiles if _p["email_count"] > 0])
     email_df = email_df.sort_values('email_count', ascending=False).reset_index(drop=True)
     email_df
     return (pd,)
 
 
 @app.cell
-def _(
-    HD_CERTIFICATION,
-    HD_HADDL_CONTACT,
-    HD_HANDLER,
-    HD_OWNER_OPERATOR,
-    HD_REPORTING,
-    mo,
-    rcra_con,
-):
+def _(handler_domain, mo, rcra_con):
+    # built by the ETL (gov_etl.domains) from HD_HANDLER, HD_CERTIFICATION,
+    # HD_REPORTING, HD_OWNER_OPERATOR and HD_HADDL_CONTACT; sorted + indexed on domain.
+    # Only rows on current HD_HANDLER records, as the contact union always did
     rcrainfo_domain_facilities = mo.sql(
         f"""
-        with handler_contacts as (
-            SELECT  handler_id
-                ,activity_location
-                ,source_type
-                ,seq_number
-                ,handler_name
-                ,contact_email_address as email
-            FROM "HD_HANDLER"
-                where current_record='Y'
-        ),
-        cert_contacts as (
-            SELECT b.handler_id
-                ,b.activity_location
-                ,b.source_type
-                ,b.seq_number
-                ,b.cert_email as email
-            FROM handler_contacts a join "HD_CERTIFICATION" b
-                on a.handler_id=b.handler_id
-                    and a.activity_location=b.activity_location
-                    and a.source_type=b.source_type
-                    and a.seq_number=b.seq_number
-        ),
-        reporting_contacts as (
-            SELECT b.handler_id
-                ,b.activity_location
-                ,b.source_type
-                ,b.seq_number
-                ,b.contact_email_address as email
-            FROM handler_contacts a join "HD_REPORTING" b
-                on a.handler_id=b.handler_id
-                    and a.activity_location=b.activity_location
-                    and a.source_type=b.source_type
-                    and a.seq_number=b.seq_number
-        ),
-        oop_contacts as (
-            SELECT b.handler_id
-                ,b.activity_location
-                ,b.source_type
-                ,b.seq_number
-                ,b.email as email
-            FROM handler_contacts a join "HD_OWNER_OPERATOR" b
-                on a.handler_id=b.handler_id
-                    and a.activity_location=b.activity_location
-                    and a.source_type=b.source_type
-                    and a.seq_number=b.seq_number
-        ),
-        haddl_contacts as (
-            SELECT b.handler_id
-                ,b.activity_location
-                ,b.source_type
-                ,b.seq_number
-                ,b.addl_contact_email_address as email
-            FROM handler_contacts a join "HD_HADDL_CONTACT" b
-                on a.handler_id=b.handler_id
-                    and a.activity_location=b.activity_location
-                    and a.source_type=b.source_type
-                    and a.seq_number=b.seq_number
-        ),
-        contact_union as (
-            select handler_id, email from handler_contacts
-            union
-            select handler_id, email from cert_contacts
-            union
-            select handler_id, email from reporting_contacts
-            union
-            select handler_id, email from oop_contacts
-            union
-            select handler_id, email from haddl_contacts
-        )
         select distinct
             handler_id
-            ,split_part(email,'@',2) as contact_domain
-        from contact_union
-        where contact_domain <> '' and contact_domain is not null and contact_domain <> '0.0'
+            ,domain as contact_domain
+        from handler_domain
+        where current_handler and domain <> '0.0'
         order by contact_domain
-
-
-        -- rcrainfo	HD_HANDLER	contact_email_address
-        -- echo	national_contact_file	email_address
-        -- rcrainfo	HD_CERTIFICATION	cert_email
-        -- rcrainfo	HD_REPORTING	contact_email_address
-        -- rcrainfo	HD_OWNER_OPERATOR	email
-        -- echo	national_organization_file	email_address
-        -- rcrainfo	HD_HADDL_CONTACT	addl_contact_email_address
         """,
         engine=rcra_con
     )
     return
 
 
-@app.cell
-def _(echo_con, mo, national_contact_file, national_organization_file):
-    echo_domain_facilities = mo.sql(
-        f"""
-        with contact_all as (
-            SELECT registry_id, email_address FROM national_contact_file
-            union
-            SELECT registry_id, email_address FROM national_organization_file
-        )
-        select distinct registry_id
-            ,split_part(email_address,'@',2) as contact_domain
-        from contact_all
-        where contact_domain <> '' and contact_domain is not null and contact_domain <> '0.0'
-        order by contact_domain
-        """,
-        engine=echo_con
-    )
-    return (echo_domain_facilities,)
-
-
 @app.cell(column=2)
 def _(mo):
     prospect_domain = mo.ui.text(placeholder="Enter domain name", label="Prospect Domain")
@@ -469,18 +193,18 @@ def _(mo):
 
 
 @app.cell
-def _(echo_con, echo_domain_facilities, mo, prospect_domain, tmp_ids):
-    import polars as pl
-
-    prospect = prospect_domain.value.upper()
-
-    filtered = (
-        echo_domain_facilities
-            .filter(pl.col("contact_domain").str.to_uppercase() == prospect)
+def _(echo_con, mo, prospect_domain, tmp_ids):
+    # echo_domain (built by the ETL from the FRS contact/organization files)
+    # holds each normalised domain's registry_ids; one indexed row per lookup
+    # tmp_ids is refilled in place rather than re-registered as a frame, so the
+    # prepared analysis statements keep their plans when the prospect changes
+    echo_con.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_ids (registry_id VARCHAR)")
+    echo_con.execute("DELETE FROM tmp_ids")
+    echo_con.execute(
+        "INSERT INTO tmp_ids SELECT unnest(registry_ids) FROM echo_domain WHERE domain = lower(trim(?))",
+        [prospect_domain.value],
     )
 
-    echo_con.register("tmp_ids", filtered.select("registry_id"))
-
     ids = mo.sql(
         f"""
         select * from tmp_ids
@@ -498,126 +222,165 @@ def _(duckdb, pd):
     #  Notebook‑ready Enhanced ECHO Analysis  (full logic preserved)
     # ──────────────────────────────────────────────────────────────────────────
     from __future__ import annotations
+    import time
     from datetime import date
-    from functools import lru_cache
     from types import SimpleNamespace
+    import weakref
     import numpy as np
-
-    # ─── 1. SQL helper functions (same outputs, now id_table‑driven) ──────────
-    def _air_q_eval(wb, we, idt="_ids"):  # FCE/PCE
+    from utils.gov_etl.activity import ActivityIndex, snapshot_index
+
+    # ─── 1. SQL helper functions (same outputs, prepared once per connection) ─
+    # date windows filter on the <column>_dt DATE columns the ETL derives
+    # (utils/gov_etl/derived.py), so nothing is parsed per row at query time.
+    # Ids come from fixed temp tables refilled per run (_load_ids), so the
+    # prepared statements in _query stay valid from one prospect to the next.
+    def _id_filter(col, by_account):
+        # one account: semi-join on the ids in _echo_ids; a batch (by_account): join the
+        # (account_no, id) pairs in _echo_acct_ids so each row carries its account, once
+        # per account; returns (select prefix, join, where, DISTINCT ON prefix)
+        if by_account:
+            return ("a.account_no AS account_id, ", f"JOIN _echo_acct_ids a ON a.id = CAST({col} AS VARCHAR)",
+                    "TRUE", "account_id, ")
+        return "", "", f"CAST({col} AS VARCHAR) IN (SELECT id FROM _echo_ids)", ""
+
+    def _air_q_eval(wb, we, by_account=False):  # FCE/PCE
+        sel, join, ids, on = _id_filter("f.registry_id", by_account)
         return f"""
-        SELECT e.pgm_sys_id || '|' || e.activity_id || '|' || e.actual_end_date AS eval_pk,
+        SELECT {sel}e.pgm_sys_id || '|' || e.activity_id || '|' || e.actual_end_date AS eval_pk,
                e.pgm_sys_id,
                CAST(f.registry_id AS VARCHAR) AS registry_id,
                e.activity_id,
-               strftime(strptime(e.actual_end_date,'%m-%d-%Y'),'%m/%d/%Y') AS actual_end_date,
-               strftime(strptime(e.actual_end_date,'%m-%d-%Y'),'%m/%d/%Y') AS actual_begin_date,
+               strftime(e.actual_end_date_dt,'%m/%d/%Y') AS actual_end_date,
+               strftime(e.actual_end_date_dt,'%m/%d/%Y') AS actual_begin_date,
                e.state_epa_flag,
-               EXTRACT(YEAR FROM strptime(e.actual_end_date,'%m-%d-%Y')) AS eval_year,
+               EXTRACT(YEAR FROM e.actual_end_date_dt) AS eval_year,
                e.activity_type_desc AS eval_type_desc,
                CASE WHEN e.comp_monitor_type_desc LIKE '%FCE%' THEN 'Y' ELSE 'N' END AS found_violation,
-               strptime(e.actual_end_date,'%m-%d-%Y') AS actual_end_date_dt
+               e.actual_end_date_dt::TIMESTAMP AS actual_end_date_dt
         FROM icis_air_fces_pces e
         JOIN icis_air_facilities f USING (pgm_sys_id)
-        WHERE strptime(e.actual_end_date,'%m-%d-%Y') BETWEEN '{wb}' AND '{we}'
-          AND CAST(f.registry_id AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE e.actual_end_date_dt BETWEEN '{wb}' AND '{we}'
+          AND {ids}
         """
 
-    def _air_q_viol(wb, we, idt="_ids"):
+    def _air_q_viol(wb, we, by_account=False):
+        sel, join, ids, on = _id_filter("f.registry_id", by_account)
         return f"""
-        SELECT v.pgm_sys_id || '|' || v.activity_id || '|' || v.earliest_frv_determ_date AS viol_pk,
+        SELECT {sel}v.pgm_sys_id || '|' || v.activity_id || '|' || v.earliest_frv_determ_date AS viol_pk,
                v.pgm_sys_id,
                v.activity_id AS air_violation_id,
-               strftime(strptime(v.earliest_frv_determ_date,'%m-%d-%Y'),'%m/%d/%Y') AS rnc_detection_date,
-               strftime(strptime(v.hpv_resolved_date,'%m-%d-%Y'),'%m/%d/%Y')       AS rnc_resolution_date,
-               EXTRACT(YEAR FROM strptime(v.earliest_frv_determ_date,'%m-%d-%Y'))  AS viol_year,
+               strftime(v.earliest_frv_determ_date_dt,'%m/%d/%Y') AS rnc_detection_date,
+               strftime(v.hpv_resolved_date_dt,'%m/%d/%Y')        AS rnc_resolution_date,
+               EXTRACT(YEAR FROM v.earliest_frv_determ_date_dt)   AS viol_year,
                COALESCE(v.program_descs,'Air Program Violation') AS viol_short_desc,
-               CASE WHEN v.hpv_resolved_date IS NOT NULL
-                    THEN DATE_DIFF('day',
-                           strptime(v.earliest_frv_determ_date,'%m-%d-%Y'),
-                           strptime(v.hpv_resolved_date,'%m-%d-%Y')) END AS days_to_resolve,
-               strptime(v.earliest_frv_determ_date,'%m-%d-%Y') AS rnc_detection_date_dt
+               DATE_DIFF('day', v.earliest_frv_determ_date_dt, v.hpv_resolved_date_dt) AS days_to_resolve,
+               v.earliest_frv_determ_date_dt::TIMESTAMP AS rnc_detection_date_dt
         FROM icis_air_violation_history v
         JOIN icis_air_facilities f USING (pgm_sys_id)
-        WHERE strptime(v.earliest_frv_determ_date,'%m-%d-%Y') BETWEEN '{wb}' AND '{we}'
-          AND CAST(f.registry_id AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE v.earliest_frv_determ_date_dt BETWEEN '{wb}' AND '{we}'
+          AND {ids}
         """
 
-    def _air_q_enf(wb, we, idt="_ids"):
+    def _air_q_enf(wb, we, by_account=False):
+        sel, join, ids, on = _id_filter("f.registry_id", by_account)
         return f"""
         WITH formal AS (
-            SELECT fa.pgm_sys_id, CAST(f.registry_id AS VARCHAR) AS registry_id,
+            SELECT {sel}fa.pgm_sys_id, CAST(f.registry_id AS VARCHAR) AS registry_id,
                    fa.activity_id, fa.enf_identifier,
                    fa.settlement_entered_date,
                    'Formal' AS action_type, fa.activity_type_desc, fa.enf_type_desc,
                    COALESCE(CAST(fa.penalty_amount AS DOUBLE),0.0) AS penalty_amt,
-                   strptime(fa.settlement_entered_date,'%m/%d/%Y') AS settlement_entered_date_dt,
+                   fa.settlement_entered_date_dt::TIMESTAMP AS settlement_entered_date_dt,
                    fa.pgm_sys_id || '|' || fa.activity_id || '|' || fa.settlement_entered_date AS enf_pk
             FROM icis_air_formal_actions fa
             JOIN icis_air_facilities f USING (pgm_sys_id)
-            WHERE fa.settlement_entered_date IS NOT NULL
-              AND strptime(fa.settlement_entered_date,'%m/%d/%Y') BETWEEN '{wb}' AND '{we}'
-              AND CAST(f.registry_id AS VARCHAR) IN (SELECT id FROM {idt})
+            {join}
+            WHERE fa.settlement_entered_date_dt BETWEEN '{wb}' AND '{we}'
+              AND {ids}
         ),
         informal AS (
-            SELECT ia.pgm_sys_id, CAST(f.registry_id AS VARCHAR) AS registry_id,
+            SELECT {sel}ia.pgm_sys_id, CAST(f.registry_id AS VARCHAR) AS registry_id,
                    ia.activity_id, ia.enf_identifier,
                    ia.achieved_date AS settlement_entered_date,
                    'Informal' AS action_type, ia.activity_type_desc, ia.enf_type_desc,
                    0.0 AS penalty_amt,
-                   strptime(ia.achieved_date,'%m/%d/%Y') AS settlement_entered_date_dt,
+                   ia.achieved_date_dt::TIMESTAMP AS settlement_entered_date_dt,
                    ia.pgm_sys_id || '|' || ia.activity_id || '|' || ia.achieved_date AS enf_pk
             FROM icis_air_informal_actions ia
             JOIN icis_air_facilities f USING (pgm_sys_id)
-            WHERE ia.achieved_date IS NOT NULL
-              AND strptime(ia.achieved_date,'%m/%d/%Y') BETWEEN '{wb}' AND '{we}'
-              AND CAST(f.registry_id AS VARCHAR) IN (SELECT id FROM {idt})
+            {join}
+            WHERE ia.achieved_date_dt BETWEEN '{wb}' AND '{we}'
+              AND {ids}
         )
         SELECT * FROM formal UNION ALL SELECT * FROM informal
         """
 
-    def _air_q_permits(idt="_ids"):
+    def _air_q_permits(by_account=False):
+        sel, join, ids, on = _id_filter("f.registry_id", by_account)
         return f"""
-        SELECT pgm_sys_id,
-               CAST(registry_id AS VARCHAR) AS registry_id,
-               facility_name, city, state AS state_code,
-               air_operating_status_code AS permit_status_code,
-               air_operating_status_desc AS permit_status_desc,
+        SELECT {sel}f.pgm_sys_id,
+               CAST(f.registry_id AS VARCHAR) AS registry_id,
+               f.facility_name, f.city, f.state AS state_code,
+               f.air_operating_status_code AS permit_status_code,
+               f.air_operating_status_desc AS permit_status_desc,
                '01/01/1970' AS effective_date, '12/31/2099' AS expiration_date,
                1 AS version_nmbr
-        FROM icis_air_facilities
-        WHERE CAST(registry_id AS VARCHAR) IN (SELECT id FROM {idt})
+        FROM icis_air_facilities f
+        {join}
+        WHERE {ids}
+        """
+
+    def _air_q_status(by_account=False):
+        _, join, ids, _ = _id_filter("f.registry_id", by_account)
+        if by_account:  # which accounts have any status history
+            return f"""
+            SELECT DISTINCT a.account_no AS account_id
+            FROM icis_air_programs ap
+            JOIN icis_air_facilities f USING (pgm_sys_id)
+            {join}
+            """
+        return f"""
+        SELECT ap.pgm_sys_id, CAST(f.registry_id AS VARCHAR) AS registry_id,
+               ap.air_operating_status_code AS status_code,
+               COALESCE(ap.updated_date,ap.begin_date) AS status_date
+        FROM icis_air_programs ap
+        JOIN icis_air_facilities f USING (pgm_sys_id)
+        WHERE {ids}
         """
 
     AIR = SimpleNamespace(
         q_eval=_air_q_eval,  q_viol=_air_q_viol,
         q_enf=_air_q_enf,    q_permits=_air_q_permits,
-        id_col="pgm_sys_id", fac_col="registry_id"
+        q_status=_air_q_status,
+        program="air", id_col="pgm_sys_id", fac_col="registry_id"
     )
 
-    def _np_q_eval(wb, we, idt="_ids"):
+    def _np_q_eval(wb, we, by_account=False):
+        sel, join, ids, on = _id_filter("f.facility_uin", by_account)
         return f"""
-        SELECT DISTINCT ON (eval_pk)
-               CONCAT_WS('|',i.npdes_id,i.activity_id,i.actual_begin_date) AS eval_pk,
+        SELECT DISTINCT ON ({on}eval_pk)
+               {sel}CONCAT_WS('|',i.npdes_id,i.activity_id,i.actual_begin_date) AS eval_pk,
                i.npdes_id, f.facility_uin,
                i.activity_id, i.actual_begin_date, i.actual_end_date,
-               EXTRACT(YEAR FROM strptime(i.actual_begin_date,'%m/%d/%Y')) AS eval_year,
+               EXTRACT(YEAR FROM i.actual_begin_date_dt) AS eval_year,
                i.comp_monitor_type_desc AS eval_type_desc,
                'N' AS found_violation
         FROM water_npdes_inspections i
         JOIN water_icis_facilities f USING (npdes_id)
-        WHERE strptime(i.actual_begin_date,'%m/%d/%Y') BETWEEN '{wb}' AND '{we}'
-          AND CAST(f.facility_uin AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE i.actual_begin_date_dt BETWEEN '{wb}' AND '{we}'
+          AND {ids}
         """
 
-    def _np_q_viol(wb, we, idt="_ids"):
+    def _np_q_viol(wb, we, by_account=False):
+        sel, join, ids, on = _id_filter("f.facility_uin", by_account)
         return f"""
-        SELECT DISTINCT ON (viol_pk)
-               CONCAT_WS('|',v.npdes_id,v.npdes_violation_id,v.rnc_detection_date) AS viol_pk,
-               v.*, CASE WHEN v.rnc_resolution_date IS NOT NULL
-                         THEN DATE_DIFF('day',
-                              strptime(v.rnc_detection_date,'%m/%d/%Y'),
-                              strptime(v.rnc_resolution_date,'%m/%d/%Y')) END AS days_to_resolve
+        SELECT DISTINCT ON ({on}viol_pk)
+               {sel}CONCAT_WS('|',v.npdes_id,v.npdes_violation_id,v.rnc_detection_date) AS viol_pk,
+               v.* EXCLUDE (rnc_detection_date_dt, rnc_resolution_date_dt),
+               DATE_DIFF('day', v.rnc_detection_date_dt, v.rnc_resolution_date_dt) AS days_to_resolve
         FROM (
             SELECT * FROM water_npdes_ps_violations
             UNION ALL
@@ -626,39 +389,83 @@ def _(duckdb, pd):
             SELECT * FROM water_npdes_se_violations
         ) v
         JOIN water_icis_facilities f USING (npdes_id)
-        WHERE strptime(v.rnc_detection_date,'%m/%d/%Y') BETWEEN '{wb}' AND '{we}'
-          AND CAST(f.facility_uin AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE v.rnc_detection_date_dt BETWEEN '{wb}' AND '{we}'
+          AND {ids}
         """
 
-    def _np_q_enf(wb, we, idt="_ids"):
+    def _np_q_enf(wb, we, by_account=False):
+        sel, join, ids, on = _id_filter("f.facility_uin", by_account)
         return f"""
-        SELECT DISTINCT ON (enf_pk)
-               CONCAT_WS('|',e.npdes_id,e.enf_identifier,e.settlement_entered_date) AS enf_pk,
-               e.*, COALESCE(CAST(e.fed_penalty_assessed_amt AS DOUBLE),0.0) +
-                    COALESCE(CAST(e.state_local_penalty_amt  AS DOUBLE),0.0) AS penalty_amt
+        SELECT DISTINCT ON ({on}enf_pk)
+               {sel}CONCAT_WS('|',e.npdes_id,e.enf_identifier,e.settlement_entered_date) AS enf_pk,
+               e.* EXCLUDE (settlement_entered_date_dt),
+               COALESCE(CAST(e.fed_penalty_assessed_amt AS DOUBLE),0.0) +
+               COALESCE(CAST(e.state_local_penalty_amt  AS DOUBLE),0.0) AS penalty_amt
         FROM water_npdes_formal_enforcement_actions e
         JOIN water_icis_facilities f USING (npdes_id)
-        WHERE strptime(e.settlement_entered_date,'%m/%d/%Y') BETWEEN '{wb}' AND '{we}'
-          AND CAST(f.facility_uin AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE e.settlement_entered_date_dt BETWEEN '{wb}' AND '{we}'
+          AND {ids}
         """
 
-    def _np_q_permits(idt="_ids"):
+    def _np_q_permits(by_account=False):
+        sel, join, ids, on = _id_filter("f.facility_uin", by_account)
         return f"""
-        SELECT p.external_permit_nmbr AS npdes_id,
+        SELECT {sel}p.external_permit_nmbr AS npdes_id,
                f.facility_uin, f.facility_name, f.city, f.state_code,
                p.effective_date, p.expiration_date,
                p.permit_status_code, p.version_nmbr
         FROM water_icis_permits p
         JOIN water_icis_facilities f ON p.external_permit_nmbr = f.npdes_id
-        WHERE CAST(f.facility_uin AS VARCHAR) IN (SELECT id FROM {idt})
+        {join}
+        WHERE {ids}
         """
 
     NPDES = SimpleNamespace(
         q_eval=_np_q_eval,   q_viol=_np_q_viol,
         q_enf=_np_q_enf,     q_permits=_np_q_permits,
-        id_col="npdes_id",   fac_col="facility_uin"
+        program="water", id_col="npdes_id", fac_col="facility_uin"
     )
 
+    # ─── prepared statements, one per (program, query kind) and connection ───
+    # The window dates are literals in the statement: DuckDB re-plans a prepared
+    # statement on every EXECUTE that passes parameters (to push their values
+    # into the scan filters), so bound $1/$2 would save nothing. A statement is
+    # re-prepared only when its SQL changes, i.e. when the window moves.
+    _PLANS = weakref.WeakKeyDictionary()   # connection -> {(program, kind): prepared SQL}
+
+    def _query(con, mod, kind, *dates, by_account=False, prepared=True) -> pd.DataFrame:
+        # run mod.q_<kind>(*dates); with prepared, parse and plan only on first
+        # use (per connection and window) and EXECUTE the cached plan after that
+        sql = getattr(mod, "q_" + kind)(*dates, by_account=by_account)
+        if not prepared:
+            return con.execute(sql).fetchdf()
+        key = (mod.program, f"{kind}_by_account" if by_account else kind)
+        name = "echo_" + "_".join(key)
+        plans = _PLANS.setdefault(con, {})
+        if plans.get(key) != sql:
+            con.execute(f"PREPARE {name} AS {sql}")
+            plans[key] = sql
+        return con.execute(f"EXECUTE {name}").fetchdf()
+
+    def _load_ids(con, pairs:pd.DataFrame|None=None):
+        # refill the fixed id tables the prepared statements read: _echo_ids from
+        # tmp_ids, or _echo_acct_ids from (account_no, registry_id) pairs
+        if pairs is None:
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS _echo_ids (id VARCHAR)")
+            con.execute("DELETE FROM _echo_ids")
+            con.execute("INSERT INTO _echo_ids SELECT DISTINCT CAST(registry_id AS VARCHAR) FROM tmp_ids")
+        else:
+            con.execute("CREATE TEMP TABLE IF NOT EXISTS _echo_acct_ids (account_no INTEGER, id VARCHAR)")
+            con.execute("DELETE FROM _echo_acct_ids")
+            # a relation, not register(): catalog changes would force every plan to rebind
+            (con.from_df(pairs)
+                .filter("registry_id IS NOT NULL")
+                .project("account_no, CAST(registry_id AS VARCHAR) AS id")
+                .distinct()
+                .insert_into("_echo_acct_ids"))
+
     # helper for date slicing
     def _slice(df,col,start,end):
         if df.empty: return df
@@ -666,122 +473,214 @@ def _(duckdb, pd):
         _df[f"{col}_dt"]=pd.to_datetime(_df[col],format="%m/%d/%Y",errors="coerce")
         return _df.query(f"{col}_dt>=@start and {col}_dt<=@end")
 
-    # ─── 2. Driver (FULL Amazon‑style logic, minus Amazon) ────────────────────
+    # ─── 2. Metric builders (kept 100 % of original math) ─────────────────────
+    def _rates(d:dict,mean_days)->dict:
+        d["viol_rate_%"]=round(100*d["evals_with_viol"]/d["evaluations"],1) if d["evaluations"] else 0.0
+        d["eval_rate_%"]=round(100*d["facs_with_eval"]/d["facilities"],1) if d["facilities"] else 0.0
+        d["avg_days_to_resolve"]=int(mean_days) if pd.notna(mean_days) else None
+        d["avg_evals_per_evald_fac"]=round(d["evaluations"]/d["facs_with_eval"],2) if d["facs_with_eval"] else 0.0
+        d["avg_viol_per_hit_eval"]=round(d["violations"]/d["evals_with_viol"],2) if d["evals_with_viol"] else 0.0
+        d["expected_violations"]=round(
+            d["facilities"]*(d["eval_rate_%"]/100)*d["avg_evals_per_evald_fac"]*
+            (d["viol_rate_%"]/100)*d["avg_viol_per_hit_eval"],2)
+        return d
+
+    def _eval_breakdown(ec:pd.DataFrame,evaluations)->list[dict]:
+        ec["percent_of_evals"]=round(100*ec["count"]/evaluations,1)
+        ec["viol_rate_%"]=round(100*ec["viol_count"]/ec["count"],1)
+        return ec.drop(columns=["viol_count"]).to_dict("records")
+
+    def _viol_breakdown(vc:pd.DataFrame,violations)->list[dict]:
+        vc["percent_of_violations"]=round(100*vc["count"]/violations,1)
+        vc["avg_resolve_days"]=vc["avg_resolve_days"].round(1)
+        return vc.to_dict("records")
+
+    def _metrics(df_eval,df_viol,df_enf,facilities_active:int,id_col:str)->dict:
+        d={}
+        d["facilities"]=facilities_active
+        d["evaluations"]=df_eval.eval_pk.nunique()
+        d["facs_with_eval"]=df_eval[id_col].nunique()
+        d["evals_with_viol"]=df_eval.loc[df_eval.found_violation=="Y","eval_pk"].nunique()
+        d["violations"]=df_viol.viol_pk.nunique()
+        d["enforcement_actions"]=df_enf.enf_pk.nunique()
+        d["total_penalties"]=round(df_enf.penalty_amt.sum(),2)
+        d["open_violations"]=df_viol.days_to_resolve.isna().sum()
+        _rates(d,df_viol.days_to_resolve.mean())
+        # breakdowns
+        if d["evaluations"]:
+            ec=df_eval.groupby("eval_type_desc").agg(
+                count=("eval_pk","nunique"),
+                viol_count=("found_violation",lambda s:(s=="Y").sum())
+            ).reset_index()
+            d["eval_type_breakdown"]=_eval_breakdown(ec,d["evaluations"])
+        else:
+            d["eval_type_breakdown"]=[]
+        if d["violations"]:
+            vc=df_viol.groupby("viol_short_desc",dropna=False).agg(
+                count=("viol_pk","nunique"),
+                avg_resolve_days=("days_to_resolve","mean")
+            ).reset_index()
+            d["viol_short_breakdown"]=_viol_breakdown(vc,d["violations"])
+        else:
+            d["viol_short_breakdown"]=[]
+        return d
+
+    def _grouped_metrics(e,v,f,keys:list,facilities:pd.Series,id_col:str,
+                         skip_empty=False)->list[tuple]:
+        # _metrics for every group of `keys` at once: one group-by per measure and
+        # one pass per breakdown instead of one pandas round trip per group.
+        # facilities: active-facility count per group to report, indexed (and
+        # ordered) by group key. skip_empty drops groups with no facilities and
+        # no rows, like the per-quarter loop. Returns [(key, metrics dict)].
+        def _index(df):
+            return pd.MultiIndex.from_frame(df[keys]) if len(keys)>1 else pd.Index(df[keys[0]])
+        ge,gv,gf=e.groupby(keys),v.groupby(keys),f.groupby(keys)
+        idx=facilities.index
+        n_rows=ge.size().add(gv.size(),fill_value=0).add(gf.size(),fill_value=0)
+        evaluations=ge.eval_pk.nunique()
+        violations=gv.viol_pk.nunique()
+        measures={
+            "evaluations":evaluations,
+            "facs_with_eval":ge[id_col].nunique(),
+            "evals_with_viol":e[e.found_violation=="Y"].groupby(keys).eval_pk.nunique(),
+            "violations":violations,
+            "enforcement_actions":gf.enf_pk.nunique(),
+            "total_penalties":None,   # placeholder keeping the column order; set below
+            "open_violations":v.days_to_resolve.isna().groupby([v[k] for k in keys]).sum(),
+        }
+        counts=pd.DataFrame({c:(0 if s is None else s.reindex(idx,fill_value=0)) for c,s in measures.items()},
+                            index=idx)
+        # to_dict gives Python ints, so _rates rounds exactly as it does in _metrics
+        counts=counts.to_dict("records")
+        penalties=gf.penalty_amt.agg(lambda s:s.sum()).reindex(idx,fill_value=0.0).to_numpy()  # Series.sum, as in _metrics
+        mean_days=gv.days_to_resolve.mean().reindex(idx).to_numpy()
+        n_rows=n_rows.reindex(idx,fill_value=0).to_numpy()
+
+        # breakdowns for all groups in one frame each, split back per group
+        ec=(e.assign(_y=e.found_violation=="Y")
+             .groupby(keys+["eval_type_desc"])
+             .agg(count=("eval_pk","nunique"),viol_count=("_y","sum"))
+             .reset_index())
+        ec["percent_of_evals"]=round(100*ec["count"]/evaluations.reindex(_index(ec)).to_numpy(),1)
+        ec["viol_rate_%"]=round(100*ec["viol_count"]/ec["count"],1)
+        vc=(v.groupby(keys+["viol_short_desc"],dropna=False)
+             .agg(count=("viol_pk","nunique"),avg_resolve_days=("days_to_resolve","mean"))
+             .reset_index())
+        vc["percent_of_violations"]=round(100*vc["count"]/violations.reindex(_index(vc)).to_numpy(),1)
+        vc["avg_resolve_days"]=vc["avg_resolve_days"].round(1)
+        ec_by,vc_by={},{}
+        for by,df,cols in ((ec_by,ec,["eval_type_desc","count","percent_of_evals","viol_rate_%"]),
+                           (vc_by,vc,["viol_short_desc","count","avg_resolve_days","percent_of_violations"])):
+            for k,rec in zip(_index(df),df[cols].to_dict("records")):
+                by.setdefault(k,[]).append(rec)
+
+        out=[]
+        for k,facs,c,pen,days,n in zip(idx,facilities.to_numpy(),counts,penalties,mean_days,n_rows):
+            facs=int(facs)
+            if skip_empty and not facs and not n:
+                continue
+            d={"facilities":facs,**c}
+            d["total_penalties"]=round(pen,2)
+            _rates(d,days)
+            d["eval_type_breakdown"]=ec_by.get(k,[]) if d["evaluations"] else []
+            d["viol_short_breakdown"]=vc_by.get(k,[]) if d["violations"] else []
+            out.append((k,d))
+        return out
+
+    def _periods(wb:date,today:date)->pd.PeriodIndex:
+        return pd.period_range(start=pd.Period(year=wb.year,quarter=1,freq='Q'),
+                               end=pd.Period(today,freq='Q'),freq='Q')
+
+    def _by_q(df,col,periods,today):
+        # parse a date column once and tag rows with their quarter; rows outside
+        # [first quarter, today] fall in no quarter, as in the per-quarter loop
+        lo,hi=pd.Timestamp(periods[0].start_time.date()),pd.Timestamp(today)
+        dt=pd.to_datetime(df[col],format="%m/%d/%Y",errors="coerce")
+        keep=(dt>=lo)&(dt<=hi)
+        return df[keep].assign(_q=dt[keep].dt.to_period("Q"))
+
+    # ─── 3. Driver (FULL Amazon‑style logic, minus Amazon) ────────────────────
+    def run_echo_queries(echo_con: duckdb.DuckDBPyConnection,
+                         dataset:str="air",
+                         years_lookback:int=5,
+                         prepared:bool=True) -> dict[str,pd.DataFrame]:
+        # the SQL half of run_echo_analysis for the ids in tmp_ids: evals, viols,
+        # enfs and permits (plus status_hist for air). prepared=False re-plans
+        # every query, the baseline for the prepared-statement benchmark.
+        mod = AIR if dataset.lower()=="air" else NPDES
+        today, wb = date.today(), date(date.today().year-years_lookback,1,1)
+        _load_ids(echo_con)   # tmp_ids -> _echo_ids
+        return dict(
+            evals=_query(echo_con,mod,"eval",wb,today,prepared=prepared),
+            viols=_query(echo_con,mod,"viol",wb,today,prepared=prepared),
+            enfs=_query(echo_con,mod,"enf",wb,today,prepared=prepared),
+            permits=_query(echo_con,mod,"permits",prepared=prepared),
+            # ── active facility helper (keeps STATUS logic for air) ───────────
+            status_hist=(_query(echo_con,mod,"status",prepared=prepared) if mod is AIR else pd.DataFrame()),
+        )
+
     def run_echo_analysis(echo_con: duckdb.DuckDBPyConnection,
                           dataset:str="air",
-                          years_lookback:int=5) -> dict[str,pd.DataFrame]:
+                          years_lookback:int=5,
+                          quarter_engine:str="grouped",
+                          timings:dict|None=None) -> dict[str,pd.DataFrame]:
+        # quarter_engine: "grouped" = one group-by pass over all quarters,
+        # "loop" = original per-quarter slicing (kept as the reference).
+        # timings, if given, receives the seconds spent on the quarterly table.
         mod = AIR if dataset.lower()=="air" else NPDES
         today, wb = date.today(), date(date.today().year-years_lookback,1,1)
 
-        # provide tmp_ids as view
-        echo_con.execute("CREATE OR REPLACE TEMP VIEW _ids AS "
-                         "SELECT CAST(registry_id AS VARCHAR) AS id FROM tmp_ids")
-
-        evals = echo_con.execute(mod.q_eval(wb,today)).fetchdf()
-        viols = echo_con.execute(mod.q_viol(wb,today)).fetchdf()
-        enfs  = echo_con.execute(mod.q_enf(wb,today)).fetchdf()
-        permits = echo_con.execute(mod.q_permits()).fetchdf()
+        q = run_echo_queries(echo_con, dataset, years_lookback)
+        evals, viols, enfs, permits, status_hist = (
+            q["evals"], q["viols"], q["enfs"], q["permits"], q["status_hist"])
 
         facilities = permits[[mod.id_col,mod.fac_col,"facility_name","city","state_code"]].drop_duplicates()
 
-        # ── active facility helper (keeps STATUS logic for air) ───────────────
-        if dataset.lower()=="air":
-            status_hist = echo_con.execute(f"""
-                SELECT ap.{mod.id_col}, CAST(f.{mod.fac_col} AS VARCHAR) AS {mod.fac_col},
-                       ap.air_operating_status_code AS status_code,
-                       COALESCE(ap.updated_date,ap.begin_date) AS status_date
-                FROM icis_air_programs ap
-                JOIN icis_air_facilities f USING ({mod.id_col})
-                WHERE CAST(f.{mod.fac_col} AS VARCHAR) IN (SELECT id FROM _ids)
-            """).fetchdf()
+        # active facilities as of any date: interval index over the whole snapshot
+        # (built once, cached per snapshot file), narrowed to this account
+        if dataset.lower()=="air" and status_hist.empty:
+            activity=ActivityIndex.always(permits[mod.id_col])  # snapshot fallback
         else:
-            status_hist = pd.DataFrame()
-
-        @lru_cache
-        def active_ids_asof(cutoff:date)->set[str]:
-            if dataset.lower()=="water":
-                p=permits.copy()
-                p["effective_date"]=pd.to_datetime(p.effective_date,format="%m/%d/%Y",errors="coerce")
-                p["expiration_date"]=pd.to_datetime(p.expiration_date,format="%m/%d/%Y",errors="coerce")
-                cut=pd.Timestamp(cutoff)
-                active=p[(p.effective_date<=cut)&((p.expiration_date.isna())|(p.expiration_date>=cut))&(
-                         p.permit_status_code.isin(["EFF","ADC"]))]
-                if active.empty: return set()
-                return set(active.groupby(mod.id_col).head(1)[mod.id_col])
-            # air
-            if status_hist.empty:
-                return set(permits[mod.id_col])  # snapshot fallback
-            h=status_hist.copy()
-            h["status_date"]=pd.to_datetime(h.status_date,format="%m/%d/%Y",errors="coerce")
-            h=h[h.status_date<=pd.Timestamp(cutoff)]
-            if h.empty: return set()
-            latest=h.loc[h.groupby(mod.id_col).status_date.idxmax()]
-            return set(latest[latest.status_code.str.strip().isin(["OPR","SEA","TMP","CNS","PLN"])][mod.id_col])
+            activity=snapshot_index(echo_con,dataset.lower()).restrict(permits[mod.id_col])
+        active_ids_asof=activity.active_asof
 
         active_now=active_ids_asof(today)
         fac_count=len(active_now)
 
-        # ── metric builder (kept 100 % of original math) ───────────────────────
-        def _metrics(df_eval,df_viol,df_enf,facilities_active:int)->dict:
-            d={}
-            d["facilities"]=facilities_active
-            d["evaluations"]=df_eval.eval_pk.nunique()
-            d["facs_with_eval"]=df_eval[mod.id_col].nunique()
-            d["evals_with_viol"]=df_eval.loc[df_eval.found_violation=="Y","eval_pk"].nunique()
-            d["violations"]=df_viol.viol_pk.nunique()
-            d["enforcement_actions"]=df_enf.enf_pk.nunique()
-            d["total_penalties"]=round(df_enf.penalty_amt.sum(),2)
-            d["open_violations"]=df_viol.days_to_resolve.isna().sum()
-            d["viol_rate_%"]=round(100*d["evals_with_viol"]/d["evaluations"],1) if d["evaluations"] else 0.0
-            d["eval_rate_%"]=round(100*d["facs_with_eval"]/d["facilities"],1) if d["facilities"] else 0.0
-            d["avg_days_to_resolve"]=int(df_viol.days_to_resolve.dropna().mean()) if not df_viol.days_to_resolve.dropna().empty else None
-            d["avg_evals_per_evald_fac"]=round(d["evaluations"]/d["facs_with_eval"],2) if d["facs_with_eval"] else 0.0
-            d["avg_viol_per_hit_eval"]=round(d["violations"]/d["evals_with_viol"],2) if d["evals_with_viol"] else 0.0
-            d["expected_violations"]=round(
-                d["facilities"]*(d["eval_rate_%"]/100)*d["avg_evals_per_evald_fac"]*
-                (d["viol_rate_%"]/100)*d["avg_viol_per_hit_eval"],2)
-            # breakdowns
-            if d["evaluations"]:
-                ec=df_eval.groupby("eval_type_desc").agg(
-                    count=("eval_pk","nunique"),
-                    viol_count=("found_violation",lambda s:(s=="Y").sum())
-                ).reset_index()
-                ec["percent_of_evals"]=round(100*ec["count"]/d["evaluations"],1)
-                ec["viol_rate_%"]=round(100*ec["viol_count"]/ec["count"],1)
-                d["eval_type_breakdown"]=ec.drop(columns=["viol_count"]).to_dict("records")
-            else:
-                d["eval_type_breakdown"]=[]
-            if d["violations"]:
-                vc=df_viol.groupby("viol_short_desc",dropna=False).agg(
-                    count=("viol_pk","nunique"),
-                    avg_resolve_days=("days_to_resolve","mean")
-                ).reset_index()
-                vc["percent_of_violations"]=round(100*vc["count"]/d["violations"],1)
-                vc["avg_resolve_days"]=vc["avg_resolve_days"].round(1)
-                d["viol_short_breakdown"]=vc.to_dict("records")
-            else:
-                d["viol_short_breakdown"]=[]
-            return d
-
-        overall=pd.DataFrame([_metrics(evals,viols,enfs,fac_count)])
+        overall=pd.DataFrame([_metrics(evals,viols,enfs,fac_count,mod.id_col)])
 
         # ── quarterly breakdowns (full logic) ─────────────────────────────────
-        qrows=[]
-        periods=pd.period_range(start=pd.Period(year=wb.year,quarter=1,freq='Q'),
-                                end=pd.Period(today,freq='Q'),freq='Q')
-        for p in periods:
-            q_start,q_end=p.start_time.date(),min(p.end_time.date(),today)
-            active_q=active_ids_asof(q_end)
-            facs_q=len(active_q)
-
-            e_q=_slice(evals,"actual_begin_date",q_start,q_end)
-            v_q=_slice(viols,"rnc_detection_date",q_start,q_end)
-            f_q=_slice(enfs ,"settlement_entered_date",q_start,q_end)
-
-            if not facs_q and e_q.empty and v_q.empty and f_q.empty:
-                continue
-            qrows.append({"quarter":f"{p.year}Q{p.quarter}",**_metrics(e_q,v_q,f_q,facs_q)})
-        quarter_df=pd.DataFrame(qrows)
+        periods=_periods(wb,today)
+
+        def _quarters_loop()->pd.DataFrame:
+            qrows=[]
+            for p in periods:
+                q_start,q_end=p.start_time.date(),min(p.end_time.date(),today)
+                active_q=active_ids_asof(q_end)
+                facs_q=len(active_q)
+
+                e_q=_slice(evals,"actual_begin_date",q_start,q_end)
+                v_q=_slice(viols,"rnc_detection_date",q_start,q_end)
+                f_q=_slice(enfs ,"settlement_entered_date",q_start,q_end)
+
+                if not facs_q and e_q.empty and v_q.empty and f_q.empty:
+                    continue
+                qrows.append({"quarter":f"{p.year}Q{p.quarter}",**_metrics(e_q,v_q,f_q,facs_q,mod.id_col)})
+            return pd.DataFrame(qrows)
+
+        def _quarters_grouped()->pd.DataFrame:
+            q_ends=[min(p.end_time.date(),today) for p in periods]
+            facs_by_q=pd.Series(activity.active_counts(q_ends).to_numpy(),index=periods)  # one sweep for every quarter end
+            rows=_grouped_metrics(_by_q(evals,"actual_begin_date",periods,today),
+                                  _by_q(viols,"rnc_detection_date",periods,today),
+                                  _by_q(enfs,"settlement_entered_date",periods,today),
+                                  ["_q"],facs_by_q,mod.id_col,skip_empty=True)
+            return pd.DataFrame([{"quarter":f"{p.year}Q{p.quarter}",**d} for p,d in rows])
+
+        _t0=time.perf_counter()
+        quarter_df=_quarters_loop() if quarter_engine=="loop" else _quarters_grouped()
+        if timings is not None:
+            timings["quarters"]=time.perf_counter()-_t0
 
         return dict(
             evals_df=evals, viols_df=viols, enfs_df=enfs,
@@ -789,6 +688,72 @@ def _(duckdb, pd):
             account_summary_df=overall, quarter_summary_df=quarter_df
         )
 
+    def run_echo_analysis_batch(echo_con: duckdb.DuckDBPyConnection,
+                                accounts: pd.DataFrame,
+                                dataset:str="air",
+                                years_lookback:int=5) -> dict:
+        # run_echo_analysis for many accounts in one call. accounts holds
+        # (account_id, registry_id) pairs; each query runs once with account_id
+        # carried through, and the metrics are one group-by per measure over
+        # (account_id[, quarter]). Every frame gains a leading account_id column;
+        # per account the numbers match a run_echo_analysis on its registry_ids.
+        # "throughput" reports accounts, seconds and accounts_per_s.
+        _t0=time.perf_counter()
+        mod = AIR if dataset.lower()=="air" else NPDES
+        today, wb = date.today(), date(date.today().year-years_lookback,1,1)
+
+        account_ids=pd.Index(accounts["account_id"].drop_duplicates(),name="account_id")
+        _load_ids(echo_con,pd.DataFrame({"account_no":account_ids.get_indexer(accounts["account_id"]),
+                                         "registry_id":accounts["registry_id"]}))
+
+        def _fetch(kind,*dates):
+            # account_no (a position in account_ids) back to the caller's account_id
+            df=_query(echo_con,mod,kind,*dates,by_account=True)
+            df["account_id"]=account_ids.to_numpy()[df["account_id"].to_numpy()]
+            return df
+
+        evals = _fetch("eval",wb,today)
+        viols = _fetch("viol",wb,today)
+        enfs  = _fetch("enf",wb,today)
+        permits = _fetch("permits")
+
+        facilities = permits[["account_id",mod.id_col,mod.fac_col,"facility_name","city","state_code"]].drop_duplicates()
+
+        # active counts per account: the snapshot index narrowed to each account's
+        # permits; air accounts without any status history count every permit
+        periods=_periods(wb,today)
+        q_ends=[min(p.end_time.date(),today) for p in periods]   # the last one is today
+        pairs=permits[["account_id",mod.id_col]].set_axis(["group","id"],axis=1).drop_duplicates()
+        if dataset.lower()=="air":
+            with_hist=set(_fetch("status")["account_id"])
+            fallback=~pairs["group"].isin(with_hist)
+            active=pd.concat([
+                ActivityIndex.always(pairs.loc[fallback,"id"]).active_counts_by(pairs[fallback],q_ends),
+                snapshot_index(echo_con,"air").active_counts_by(pairs[~fallback],q_ends),
+            ])
+        else:
+            active=snapshot_index(echo_con,dataset.lower()).active_counts_by(pairs,q_ends)
+        active=active.reindex(account_ids,fill_value=0)
+
+        overall=pd.DataFrame([{"account_id":a,**d} for a,d in _grouped_metrics(
+            evals,viols,enfs,["account_id"],active.iloc[:,-1].rename_axis("account_id"),mod.id_col)])
+
+        facs_q=active.set_axis(periods,axis=1).stack()
+        facs_q.index=facs_q.index.set_names(["account_id","_q"])
+        rows=_grouped_metrics(_by_q(evals,"actual_begin_date",periods,today),
+                              _by_q(viols,"rnc_detection_date",periods,today),
+                              _by_q(enfs,"settlement_entered_date",periods,today),
+                              ["account_id","_q"],facs_q,mod.id_col,skip_empty=True)
+        quarter_df=pd.DataFrame([{"account_id":a,"quarter":f"{p.year}Q{p.quarter}",**d} for (a,p),d in rows])
+
+        seconds=time.perf_counter()-_t0
+        return dict(
+            evals_df=evals, viols_df=viols, enfs_df=enfs,
+            permits_df=permits, facilities_df=facilities,
+            account_summary_df=overall, quarter_summary_df=quarter_df,
+            throughput={"accounts":len(account_ids),"seconds":round(seconds,3),
+                        "accounts_per_s":round(len(account_ids)/seconds,1) if seconds else None},
+        )
 
 
     # ─── Example --------------------------------------------------------------
@@ -796,8 +761,12 @@ def _(duckdb, pd):
     # results = run_echo_analysis(echo_con, dataset="air", years_lookback=5)
     # results["account_summary_df"]
     # results["quarter_summary_df"]
+    #
+    # pairs = pd.DataFrame({"account_id": [...], "registry_id": [...]})
+    # batch = run_echo_analysis_batch(echo_con, pairs, dataset="air")
+    # batch["account_summary_df"], batch["throughput"]
 
-    return (run_echo_analysis,)
+    return run_echo_analysis, run_echo_analysis_batch, run_echo_queries
 
 
 @app.cell
@@ -808,5 +777,89 @@ def _(echo_con, run_echo_analysis):
     return
 
 
+@app.cell
+def _(mo):
+    bench_quarters_button = mo.ui.run_button(label="Benchmark quarterly engines")
+    bench_quarters_button
+    return (bench_quarters_button,)
+
+
+@app.cell
+def _(bench_quarters_button, echo_con, mo, pd, run_echo_analysis):
+    # grouped single-pass quarterly engine vs the original per-quarter loop on the
+    # current account: times only the quarterly table and checks both agree
+    mo.stop(not bench_quarters_button.value)
+
+    _runs, _frames = [], {}
+    for _dataset in ("air", "water"):
+        for _engine in ("loop", "grouped"):
+            for _i in range(3):
+                _t = {}
+                _frames[_dataset, _engine] = run_echo_analysis(
+                    echo_con, dataset=_dataset, years_lookback=5, quarter_engine=_engine, timings=_t
+                )["quarter_summary_df"]
+                _runs.append({"dataset": _dataset, "engine": _engine, "seconds": _t["quarters"]})
+
+    def _same(a, b):
+        if list(a.columns) != list(b.columns) or len(a) != len(b):
+            return False
+        _scalar = [c for c in a.columns if not c.endswith("_breakdown")]
+        _breakdown = [c for c in a.columns if c.endswith("_breakdown")]
+        # breakdowns are lists of dicts that may hold NaN; compare them as frames
+        return a[_scalar].equals(b[_scalar]) and all(
+            pd.DataFrame(x).equals(pd.DataFrame(y)) for c in _breakdown for x, y in zip(a[c], b[c])
+        )
+
+    quarter_bench_df = (
+        pd.DataFrame(_runs)
+        .groupby(["dataset", "engine"], sort=False).seconds.min().unstack()   # best of 3
+        .assign(speedup=lambda t: (t["loop"] / t["grouped"]).round(1))
+        .round({"loop": 3, "grouped": 3})
+        .rename_axis(columns=None)
+        .reset_index()
+    )
+    quarter_bench_df["identical"] = [
+        _same(_frames[d, "loop"], _frames[d, "grouped"]) for d in quarter_bench_df["dataset"]
+    ]
+    quarter_bench_df
+    return
+
+
+@app.cell
+def _(mo):
+    bench_plans_button = mo.ui.run_button(label="Benchmark prepared queries")
+    bench_plans_button
+    return (bench_plans_button,)
+
+
+@app.cell
+def _(bench_plans_button, echo_con, mo, pd, run_echo_queries):
+    # SQL latency of one analysis on the current account: every query parsed and
+    # planned per call vs executed from the cached prepared statements
+    import time as _time
+    mo.stop(not bench_plans_button.value)
+
+    _runs = []
+    for _dataset in ("air", "water"):
+        for _prepared in (False, True):
+            run_echo_queries(echo_con, dataset=_dataset, prepared=_prepared)   # warm-up (and PREPARE)
+            for _i in range(20):
+                _t0 = _time.perf_counter()
+                run_echo_queries(echo_con, dataset=_dataset, prepared=_prepared)
+                _runs.append({"dataset": _dataset, "prepared": _prepared, "ms": (_time.perf_counter() - _t0) * 1000})
+
+    plan_bench_df = (
+        pd.DataFrame(_runs)
+        .groupby(["dataset", "prepared"], sort=False).ms.median().unstack()   # median of 20
+        .rename(columns={False: "replanned_ms", True: "prepared_ms"})
+        .assign(saved_ms=lambda t: t["replanned_ms"] - t["prepared_ms"])
+        .round(2)
+        .rename_axis(columns=None)
+        .reset_index()
+    )
+    plan_bench_df
+    return
+
+
 if __name__ == "__main__":
     app.run()
@@ -0,0 +1,121 @@
+"""Local HTTP stand-in for the EPA download hosts.
+
+Serves in-memory files with an ETag, honours ``Range``/``If-Range`` the way
+S3 does, and can misbehave on cue: drop a connection part-way through a body,
+ignore ``Range`` and send the whole file, or hang up before answering at all.
+Every request is recorded so tests can check what the client sent.
+"""
+
+import re
+import socket
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class Resource:
+    body: bytes
+    etag: str | None = '"v1"'
+    drops: list[int] = field(default_factory=list)   # per GET: bytes sent before hanging up
+    honor_range: bool = True
+    refuse: bool = False                               # hang up without a response (network error)
+
+
+class StandIn:
+    """``with StandIn() as srv: srv.files["/x.zip"] = Resource(b"...")``; ``srv.url("/x.zip")``."""
+
+    def __init__(self, missing_status: int | None = 403):   # S3 answers 403; None hangs up instead
+        self.files: dict[str, Resource] = {}
+        self.requests: list[tuple[str, str, dict]] = []   # (method, path, headers)
+        self.missing_status = missing_status
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def sent(self, method: str) -> list[tuple[str, dict]]:
+        return [(path, headers) for m, path, headers in self.requests if m == method]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _handler(srv: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _resource(self) -> Resource | None:
+            srv.requests.append((self.command, self.path, dict(self.headers)))
+            res = srv.files.get(self.path)
+            if res is None and srv.missing_status is not None:
+                self.send_response(srv.missing_status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            if res is None or res.refuse:
+                self._hang_up()
+                return None
+            return res
+
+        def _hang_up(self):
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+        def _start(self, res: Resource) -> int | None:
+            """Offset to send from, or None once a 416 has been answered."""
+            m = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if_range = self.headers.get("If-Range")
+            if not (m and res.honor_range and (if_range is None or if_range == res.etag)):
+                self.send_response(200)
+                return 0
+            start = int(m.group(1))
+            if start >= len(res.body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(res.body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(res.body) - 1}/{len(res.body)}")
+            return start
+
+        def _headers(self, res: Resource, start: int):
+            self.send_header("Content-Length", str(len(res.body) - start))
+            if res.etag:
+                self.send_header("ETag", res.etag)
+            self.end_headers()
+
+        def do_HEAD(self):
+            res = self._resource()
+            if res:
+                self.send_response(200)
+                self._headers(res, 0)
+
+        def do_GET(self):
+            res = self._resource()
+            if not res:
+                return
+            start = self._start(res)
+            if start is None:
+                return
+            self._headers(res, start)
+            body = res.body[start:]
+            if res.drops:
+                self.wfile.write(body[:res.drops.pop(0)])
+                self.wfile.flush()
+                self._hang_up()
+                return
+            self.wfile.write(body)
+
+    return Handler
@@ -0,0 +1,42 @@
+"""``gov-etl`` exit codes and import weight."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils.gov_etl import cli
+
+
+def _events(out: str) -> list[dict]:
+    return [json.loads(line) for line in out.splitlines()]
+
+
+@pytest.mark.parametrize("results, code, status", [
+    ({"air": None, "water": None}, cli.EXIT_OK, "ok"),
+    ({"air": None, "water": IOError("x")}, cli.EXIT_PARTIAL, "partial"),
+    ({"air": IOError("x"), "water": IOError("y")}, cli.EXIT_FAILED, "failed"),
+])
+def test_dataset_results_map_to_exit_codes(monkeypatch, capsys, results, code, status):
+    monkeypatch.setattr(cli, "run_all", lambda **kw: results)
+    assert cli.main(["--echo", "air", "water", "-q"]) == code
+    assert _events(capsys.readouterr().out)[-1]["status"] == status
+
+
+def test_crash_has_its_own_exit_code(monkeypatch, capsys):
+    def crash(**kw):
+        raise RuntimeError("publish failed")
+    monkeypatch.setattr(cli, "run_all", crash)
+
+    assert cli.main(["--echo", "air", "-q"]) == cli.EXIT_CRASHED
+    done = _events(capsys.readouterr().out)[-1]
+    assert done["status"] == "crashed" and done["error"] == "RuntimeError: publish failed"
+
+
+def test_cli_import_does_not_load_pandas():
+    code = "import sys, utils.gov_etl.cli; print('pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).parents[1]).stdout
+    assert out.strip() == "False"
@@ -0,0 +1,36 @@
+"""``derived.add_dates`` when a declared source date column is missing."""
+
+import duckdb
+import pytest
+
+from utils.gov_etl import derived, layout
+
+
+@pytest.fixture
+def con():
+    with duckdb.connect() as c:
+        yield c
+
+
+def test_missing_date_column_still_sorts_by_the_other_keys(con, caplog):
+    con.execute("CREATE TABLE icis_air_fces_pces AS SELECT * FROM (VALUES ('B', '1'), ('A', '2')) t(pgm_sys_id, end_renamed)")
+    keys = layout.cluster_keys("icis_air_fces_pces")
+
+    assert derived.add_dates(con, "icis_air_fces_pces", order_by=keys) == []
+    assert con.execute("SELECT pgm_sys_id FROM icis_air_fces_pces").fetchall() == [("A",), ("B",)]
+    assert "not sorted on ['actual_end_date_dt']" in caplog.text
+    assert list(layout.zone_map_report(con, "icis_air_fces_pces", keys)) == ["pgm_sys_id"]
+
+
+def test_derived_columns_follow_source_columns_in_order(con):
+    con.execute("""CREATE TABLE icis_air_violation_history AS SELECT * FROM (VALUES
+        ('B', '01/02/2020', '02/03/2020'), ('A', '03/04/2019', NULL)
+    ) t(pgm_sys_id, earliest_frv_determ_date, hpv_resolved_date)""")
+
+    added = derived.add_dates(con, "icis_air_violation_history",
+                              order_by=layout.cluster_keys("icis_air_violation_history"))
+
+    assert added == ["earliest_frv_determ_date_dt", "hpv_resolved_date_dt"]
+    cols = [r[0] for r in con.execute("DESCRIBE icis_air_violation_history").fetchall()]
+    assert cols[-2:] == added
+    assert con.execute("SELECT pgm_sys_id FROM icis_air_violation_history").fetchall() == [("A",), ("B",)]
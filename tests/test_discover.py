@@ -0,0 +1,107 @@
+"""``discover.snapshot_stamp`` HEAD-probing a stand-in for the RCRAInfo bucket."""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from standin import Resource, StandIn
+from utils.gov_etl import discover
+from utils.gov_etl.discover import SnapshotNotFound, snapshot_stamp
+
+TODAY = date(2026, 1, 7)   # a Wednesday, in EST
+PATH = "/CSV-{date}/Handler/HD.zip"
+
+
+@pytest.fixture
+def srv():
+    with StandIn() as s:
+        yield s
+
+
+@pytest.fixture
+def bucket(srv, tmp_path, monkeypatch):
+    """``srv`` as the ``hd`` dataset's host, with a fresh stamp cache."""
+    monkeypatch.setattr(discover, "RCRA_DATASETS", {"hd": srv.url(PATH)})
+    monkeypatch.setattr(discover, "SNAPSHOT_STAMPS", tmp_path / "stamps.json")
+    return srv
+
+
+def _publish(srv, stamp: str):
+    srv.files[PATH.format(date=stamp)] = Resource(b"")
+
+
+def _probed(srv) -> list[str]:
+    return [path.split("/")[1].removeprefix("CSV-") for path, _ in srv.sent("HEAD")]
+
+
+def _cache(stamp: str, age=timedelta(days=2)):
+    checked = (datetime.now() - age).isoformat(timespec="seconds")
+    discover.SNAPSHOT_STAMPS.write_text(json.dumps({"hd": {"stamp": stamp, "checked_at": checked}}))
+
+
+def test_newest_published_stamp_wins(bucket):
+    _publish(bucket, "2026-01-05T03-00-00-0500")
+    _publish(bucket, "2025-12-29T03-00-00-0500")
+
+    assert snapshot_stamp("hd", today=TODAY) == "2026-01-05T03-00-00-0500"
+    assert _probed(bucket) == [
+        "2026-01-07T03-00-00-0400", "2026-01-07T03-00-00-0500",
+        "2026-01-06T03-00-00-0400", "2026-01-06T03-00-00-0500",
+        "2026-01-05T03-00-00-0400", "2026-01-05T03-00-00-0500",
+    ]
+    assert discover.cached_stamp("hd") == "2026-01-05T03-00-00-0500"
+
+
+def test_misses_fall_back_to_earlier_days(bucket):
+    _publish(bucket, "2025-12-30T03-00-00-0500")   # a late (Tuesday) week
+
+    assert snapshot_stamp("hd", today=TODAY) == "2025-12-30T03-00-00-0500"
+    assert len(_probed(bucket)) == 2 * 9
+
+
+def test_nothing_published_raises(bucket):
+    with pytest.raises(SnapshotNotFound, match=r"\(30 stamps probed, 0 network errors\)"):
+        snapshot_stamp("hd", today=TODAY)
+
+
+def test_network_errors_are_counted_apart_from_misses(bucket):
+    for stamp in discover.candidate_stamps(TODAY)[:4]:
+        bucket.files[PATH.format(date=stamp)] = Resource(b"", refuse=True)
+
+    with pytest.raises(SnapshotNotFound, match=r"\(30 stamps probed, 4 network errors\)"):
+        snapshot_stamp("hd", today=TODAY)
+
+
+def test_network_down_reuses_cached_stamp(bucket):
+    bucket.missing_status = None   # every probe hangs up
+    _cache("2026-01-05T03-00-00-0500")
+
+    assert snapshot_stamp("hd", today=TODAY) == "2026-01-05T03-00-00-0500"
+
+
+@pytest.mark.parametrize("offset", ["0400", "0500"])
+def test_cached_stamp_is_reprobed_for_either_offset(bucket, offset):
+    cached = f"2026-01-05T03-00-00-{offset}"
+    _publish(bucket, cached)
+    _cache(cached)
+
+    assert snapshot_stamp("hd", today=TODAY) == cached
+    assert cached in _probed(bucket)
+    assert min(_probed(bucket)) >= "2026-01-05"   # nothing older than the cached day
+
+
+def test_cached_stamp_outside_lookback_is_still_probed(bucket):
+    cached = "2025-11-03T03-00-00-0500"
+    _publish(bucket, cached)
+    _cache(cached)
+
+    assert snapshot_stamp("hd", today=TODAY) == cached
+    assert _probed(bucket)[-1] == cached
+
+
+def test_fresh_cache_skips_probing(bucket):
+    _cache("2026-01-05T03-00-00-0500", age=timedelta(minutes=5))
+
+    assert snapshot_stamp("hd", today=TODAY) == "2026-01-05T03-00-00-0500"
+    assert bucket.requests == []
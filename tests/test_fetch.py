@@ -0,0 +1,93 @@
+"""``fetch.download`` against a stand-in server that drops connections."""
+
+import json
+import os
+
+import pytest
+import requests
+
+from standin import Resource, StandIn
+from utils.gov_etl.fetch import download
+
+BODY = os.urandom(256 * 1024)
+CHUNK = 16 * 1024   # only whole chunks reach the .part before a drop, so drops are chunk multiples
+
+
+@pytest.fixture
+def srv():
+    with StandIn() as s:
+        yield s
+
+
+def _get(srv, path, to, **kw):
+    return download(srv.url(path), to, chunk=CHUNK, backoff=0, timeout=5, **kw)
+
+
+def test_resumes_after_disconnects(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY, drops=[6 * CHUNK, 3 * CHUNK])
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=3)
+
+    assert to.read_bytes() == BODY
+    ranges = [(h.get("Range"), h.get("If-Range")) for _, h in srv.sent("GET")]
+    assert ranges == [(None, None), (f"bytes={6 * CHUNK}-", '"v1"'), (f"bytes={9 * CHUNK}-", '"v1"')]
+    assert not (tmp_path / "EM.zip.part").exists()
+    assert not (tmp_path / "EM.zip.part.meta").exists()
+
+
+def test_full_body_for_range_request_restarts(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY, drops=[6 * CHUNK], honor_range=False)
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=2)
+
+    assert to.read_bytes() == BODY   # the 200 body replaced the part instead of being appended
+    assert srv.sent("GET")[1][1]["Range"] == f"bytes={6 * CHUNK}-"
+
+
+def test_changed_etag_between_runs_restarts(srv, tmp_path):
+    srv.files["/EM.zip"] = res = Resource(BODY, drops=[6 * CHUNK])
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=0)   # crashed run leaves .part + .part.meta
+    part, meta = tmp_path / "EM.zip.part", tmp_path / "EM.zip.part.meta"
+    assert part.stat().st_size == 6 * CHUNK
+    assert json.loads(meta.read_text())["validator"] == '"v1"'
+
+    res.body, res.etag = BODY[::-1], '"v2"'   # republished in the meantime
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=0)
+
+    assert to.read_bytes() == BODY[::-1]
+    assert srv.sent("GET")[1][1]["If-Range"] == '"v1"'
+
+
+def test_part_without_meta_is_discarded(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY)
+    (tmp_path / "EM.zip.part").write_bytes(b"x" * 1000)
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=0)
+
+    assert to.read_bytes() == BODY
+    assert "Range" not in srv.sent("GET")[0][1]
+
+
+def test_part_for_other_url_is_discarded(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY)
+    (tmp_path / "EM.zip.part").write_bytes(BODY[:1000])
+    (tmp_path / "EM.zip.part.meta").write_text(json.dumps({"url": srv.url("/old.zip"), "validator": '"v1"'}))
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=0)
+
+    assert to.read_bytes() == BODY
+    assert "Range" not in srv.sent("GET")[0][1]
+
+
+def test_oversized_part_restarts(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY)
+    (tmp_path / "EM.zip.part").write_bytes(BODY + b"junk")
+    (tmp_path / "EM.zip.part.meta").write_text(json.dumps({"url": srv.url("/EM.zip"), "validator": '"v1"'}))
+    to = _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=1)
+
+    assert to.read_bytes() == BODY   # 416, part dropped, full retry
+
+
+def test_gives_up_after_retries(srv, tmp_path):
+    srv.files["/EM.zip"] = Resource(BODY, drops=[2 * CHUNK] * 3)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        _get(srv, "/EM.zip", tmp_path / "EM.zip", retries=2)
+    assert len(srv.sent("GET")) == 3
+    assert (tmp_path / "EM.zip.part").stat().st_size == 6 * CHUNK   # kept for the next run to resume
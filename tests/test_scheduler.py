@@ -0,0 +1,38 @@
+"""``scheduler.run_all`` results when datasets share a DuckDB file."""
+
+import pytest
+
+from utils.gov_etl import scheduler, snapshots
+from utils.gov_etl.etl import Staged
+
+
+@pytest.fixture
+def echo_db(tmp_path, monkeypatch):
+    """Two ECHO datasets staged with one table each; ``frs`` fails to ingest."""
+    db = tmp_path / "echo.duckdb"
+    monkeypatch.setattr(scheduler, "ECHO_DB_PATH", db)
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(scheduler, "stage_echo", lambda key, *a: Staged(key, [(f"{key}_table", ["x.csv"])]))
+
+    def ingest(path, staged, *a):
+        if staged.dataset == "frs":
+            raise IOError("bad frs file")
+        return len(staged.tables)
+    monkeypatch.setattr(scheduler, "ingest", ingest)
+    return db
+
+
+def test_discarded_snapshot_fails_every_dataset_in_it(echo_db):
+    results = scheduler.run_all(echo=["air", "frs"], parquet=False)
+
+    assert isinstance(results["frs"], IOError)
+    assert isinstance(results["air"], RuntimeError) and "discarded" in str(results["air"])
+    assert not echo_db.exists()
+    assert list(snapshots.SNAPSHOT_DIR.glob("*.duckdb")) == []
+
+
+def test_published_snapshot_reports_ok(echo_db):
+    results = scheduler.run_all(echo=["air", "water"], parquet=False)
+
+    assert results == {"air": None, "water": None}
+    assert echo_db.is_symlink()
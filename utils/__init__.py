@@ -1,6 +1,10 @@
 """Marimo development utilities."""
 
 from .marimo_parser import extract_marimo_data, analyze_marimo_data
-from .marimo_parser_demo import main as demo_main
 
-__all__ = ['extract_marimo_data', 'analyze_marimo_data', 'demo_main']
\ No newline at end of file
+try:
+    from .marimo_parser_demo import main as demo_main
+except ImportError:  # demo script is not always checked out
+    demo_main = None
+
+__all__ = ['extract_marimo_data', 'analyze_marimo_data', 'demo_main']
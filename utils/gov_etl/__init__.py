@@ -0,0 +1,57 @@
+"""RCRAInfo / ECHO ETL used by the gov_data notebook."""
+
+import importlib
+
+from . import cdc, derived, discover, domains, export, frs, headers, indexes, layout, manifest, profiling, schemas, snapshots
+from .discover import SnapshotNotFound, snapshot_stamp
+from .etl import (
+    Staged,
+    disk_watermark,
+    ingest,
+    latest_monday_stamp,
+    load_csvs,
+    load_members,
+    run_echo_etl,
+    run_etl,
+    snake,
+    stage_echo,
+    stage_rcra,
+    unzip_recursive,
+)
+from .fetch import IncompleteDownload, download
+from .indexes import INDEX_KEYS
+from .layout import CLUSTER_KEYS, zone_map_report
+from .scheduler import run_all
+from .schemas import TABLE_SCHEMAS, apply_schema
+from .settings import (
+    DATA_ROOT,
+    DB_ROOT,
+    ECHO_DATASETS,
+    ECHO_DB_PATH,
+    RAW_DATA_DIR,
+    RCRA_DATASETS,
+    RCRA_DB_PATH,
+    PARQUET_ROOT,
+    SNAPSHOT_DIR,
+    SNAPSHOT_KEEP,
+    log,
+)
+from .timing import Timings
+from .zipstream import ZipMember, ZipSource, list_zip_members
+
+
+
+def __getattr__(name):
+    # activity pulls in pandas/numpy; only the notebook needs it, not the gov-etl CLI
+    if name == "activity":
+        return importlib.import_module(f"{__name__}.activity")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'CLUSTER_KEYS', 'DATA_ROOT', 'DB_ROOT', 'ECHO_DATASETS', 'ECHO_DB_PATH', 'INDEX_KEYS', 'IncompleteDownload', 'PARQUET_ROOT', 'RAW_DATA_DIR',
+    'RCRA_DATASETS', 'RCRA_DB_PATH', 'SNAPSHOT_DIR', 'SNAPSHOT_KEEP', 'SnapshotNotFound', 'Staged', 'TABLE_SCHEMAS', 'Timings', 'ZipMember', 'ZipSource', 'activity', 'apply_schema', 'cdc', 'derived', 'discover', 'disk_watermark', 'domains',
+    'download', 'export', 'frs', 'headers', 'indexes', 'ingest', 'latest_monday_stamp', 'layout', 'list_zip_members', 'load_csvs',
+    'load_members', 'log', 'manifest', 'profiling', 'run_all', 'run_echo_etl', 'run_etl', 'schemas', 'snake', 'snapshot_stamp', 'snapshots',
+    'stage_echo', 'stage_rcra', 'unzip_recursive', 'zone_map_report',
+]
@@ -0,0 +1,172 @@
+"""Facility-activity interval index: who was active on a given date.
+
+``run_echo_analysis`` needs "active facilities as of D" for today and for
+every quarter end.  Rebuilding that set per date means re-filtering and
+re-grouping the status history each time.  ``ActivityIndex`` turns the
+history into half-open ``[start, end)`` intervals during which each
+facility counts as active, merged per facility, once:
+
+* ICIS-AIR (``from_status_history``): a facility's latest status on or
+  before D decides; each dated status row holds until the next later one
+  (on a tie, the first row wins), and only ``AIR_ACTIVE_CODES`` count.
+* NPDES (``from_permits``): a permit with status in ``WATER_ACTIVE_CODES``
+  is active from its effective date through its expiration date (open if
+  there is none).
+
+``active_asof(D)`` is then one vectorised mask, and ``active_counts(dates)``
+answers every date in one ``searchsorted`` sweep.  ``snapshot_index``
+builds the index over a whole ECHO snapshot and keeps it as Parquet in
+``ACTIVITY_CACHE_DIR`` keyed on the snapshot file, so each account only
+``restrict``s it to its own facilities.
+"""
+
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .settings import ACTIVITY_CACHE_DIR, SNAPSHOT_KEEP, log
+from .snapshots import db_file, file_key
+
+AIR_ACTIVE_CODES   = ("OPR", "SEA", "TMP", "CNS", "PLN")
+WATER_ACTIVE_CODES = ("EFF", "ADC")
+DATE_FORMAT = "%m/%d/%Y"
+
+# program -> (id column, SQL over the whole snapshot)
+SOURCES = {
+    "air": ("pgm_sys_id", """
+        SELECT pgm_sys_id, air_operating_status_code AS status_code,
+               COALESCE(updated_date, begin_date) AS status_date
+        FROM icis_air_programs
+    """),
+    "water": ("npdes_id", """
+        SELECT external_permit_nmbr AS npdes_id, effective_date, expiration_date, permit_status_code
+        FROM water_icis_permits
+    """),
+}
+
+_FIRST = pd.Timestamp("1678-01-01")   # bounds inside pandas' datetime64[ns] range
+_OPEN  = pd.Timestamp("2262-01-01")   # end of an interval with no known end
+_loaded: dict[tuple, "ActivityIndex"] = {}
+
+
+def _dates(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, format=DATE_FORMAT, errors="coerce")
+
+
+class ActivityIndex:
+    """Disjoint ``[start, end)`` active intervals per facility id."""
+
+    def __init__(self, intervals: pd.DataFrame):
+        self.intervals = self._merge(intervals)
+        self._starts = np.sort(self.intervals["start"].to_numpy())
+        self._ends = np.sort(self.intervals["end"].to_numpy())
+
+    @staticmethod
+    def _merge(iv: pd.DataFrame) -> pd.DataFrame:
+        """Union overlapping/adjacent intervals of the same id."""
+        iv = iv.loc[iv["id"].notna() & (iv["start"] < iv["end"]), ["id", "start", "end"]]
+        iv = iv.sort_values(["id", "start"], kind="stable").reset_index(drop=True)
+        if iv.empty:
+            return iv
+        reach = iv.groupby("id")["end"].cummax()
+        prev = reach.groupby(iv["id"]).shift()
+        run = (prev.isna() | (iv["start"] > prev)).cumsum()
+        return (iv.groupby(run)
+                  .agg(id=("id", "first"), start=("start", "min"), end=("end", "max"))
+                  .reset_index(drop=True))
+
+    @classmethod
+    def from_status_history(cls, hist: pd.DataFrame, id_col: str, active=AIR_ACTIVE_CODES,
+                            code_col="status_code", date_col="status_date") -> "ActivityIndex":
+        h = pd.DataFrame({"id": hist[id_col], "code": hist[code_col], "start": _dates(hist[date_col])})
+        h = h[h["start"].notna() & h["id"].notna()]
+        # latest row on or before D wins; among same-day rows the first one does
+        h = h.sort_values(["id", "start"], kind="stable").drop_duplicates(["id", "start"])
+        h["end"] = h.groupby("id")["start"].shift(-1).fillna(_OPEN)
+        on = h["code"].str.strip().isin(active)
+        return cls(h.loc[on, ["id", "start", "end"]])
+
+    @classmethod
+    def from_permits(cls, permits: pd.DataFrame, id_col: str, active=WATER_ACTIVE_CODES,
+                     status_col="permit_status_code") -> "ActivityIndex":
+        start, expires = _dates(permits["effective_date"]), _dates(permits["expiration_date"])
+        iv = pd.DataFrame({
+            "id": permits[id_col],
+            "start": start,
+            "end": (expires + pd.Timedelta(days=1)).fillna(_OPEN),   # expiration day is still active
+        })
+        on = permits[status_col].isin(active) & start.notna()
+        return cls(iv[on])
+
+    @classmethod
+    def always(cls, ids) -> "ActivityIndex":
+        """Every id active on every date (no usable history)."""
+        ids = pd.Series(sorted(set(ids)), dtype=object)
+        return cls(pd.DataFrame({"id": ids, "start": _FIRST, "end": _OPEN}))
+
+    def restrict(self, ids) -> "ActivityIndex":
+        return ActivityIndex(self.intervals[self.intervals["id"].isin(set(ids))])
+
+    def active_asof(self, d: date) -> set:
+        cut = pd.Timestamp(d)
+        iv = self.intervals
+        return set(iv.loc[(iv["start"] <= cut) & (cut < iv["end"]), "id"])
+
+    def active_counts(self, dates) -> pd.Series:
+        """Active facilities on each of ``dates``, in one sweep over the sorted bounds."""
+        cut = pd.DatetimeIndex([pd.Timestamp(d) for d in dates])
+        n = (np.searchsorted(self._starts, cut.to_numpy(), side="right")
+             - np.searchsorted(self._ends, cut.to_numpy(), side="right"))
+        return pd.Series(n, index=list(dates))
+
+    def active_counts_by(self, pairs: pd.DataFrame, dates) -> pd.DataFrame:
+        """``active_counts`` per group for ``(group, id)`` ``pairs``: one row per group, one column per date."""
+        pairs = pairs[["group", "id"]].drop_duplicates()
+        iv = self.intervals.merge(pairs, on="id")   # intervals are disjoint per id, so rows count ids
+        counts = {d: ((iv["start"] <= pd.Timestamp(d)) & (pd.Timestamp(d) < iv["end"])).groupby(iv["group"]).sum()
+                  for d in dates}
+        return (pd.DataFrame(counts, columns=list(dates))
+                  .reindex(pd.Index(pairs["group"].unique(), name="group"), fill_value=0)
+                  .fillna(0).astype("int64"))
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        self.intervals.to_parquet(tmp, index=False)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ActivityIndex":
+        return cls(pd.read_parquet(path))
+
+
+def build(con, program: str) -> ActivityIndex:
+    """Index over every facility in ``con``'s ICIS-AIR (``"air"``) or NPDES (``"water"``) tables."""
+    id_col, sql = SOURCES[program]
+    df = con.execute(sql).fetchdf()
+    if program == "air":
+        return ActivityIndex.from_status_history(df, id_col)
+    return ActivityIndex.from_permits(df, id_col)
+
+
+def snapshot_index(con, program: str, refresh=False) -> ActivityIndex:
+    """``build`` for ``con``'s snapshot, cached in memory and as Parquet per snapshot file."""
+    snap = db_file(con)
+    if snap is None or not snap.exists():
+        return build(con, program)
+    key = (*file_key(snap), program)
+    if not refresh and key in _loaded:
+        return _loaded[key]
+    path = ACTIVITY_CACHE_DIR / f"{snap.stem}.{program}.{key[1]}-{key[2]}.parquet"
+    if path.exists() and not refresh:
+        index = ActivityIndex.load(path)
+    else:
+        index = build(con, program)
+        index.save(path)
+        log.info(f"🗓️  [{snap.stem}] {program} activity index: {len(index.intervals):,} intervals → {path.name}")
+        for old in sorted(ACTIVITY_CACHE_DIR.glob(f"*.{program}.*.parquet"), key=lambda p: p.stat().st_mtime)[:-SNAPSHOT_KEEP]:
+            old.unlink(missing_ok=True)
+    _loaded[key] = index
+    return index
@@ -0,0 +1,152 @@
+"""Row- and column-level deltas between consecutive snapshots.
+
+A rebuild replaces a table wholesale, but the seeded snapshot still holds the
+previous copy.  ``ingest`` renames that copy aside, loads the new one and
+calls ``capture``, which full-joins the two on the table's natural key and
+appends one row per inserted, deleted or changed key to ``etl_changes``.
+Changed rows carry only the columns that differ, as ``(column, old, new)``.
+The first load of a table has nothing to diff against and records nothing;
+tables without a key in ``NATURAL_KEYS`` (or whose key isn't unique in
+either copy) are logged and skipped.
+
+``etl_change_history`` flattens that to one row per changed column::
+
+    SELECT key['handler_id'], old_value, new_value
+    FROM etl_change_history
+    WHERE table_name = 'HD_HANDLER' AND column_name = 'fed_waste_generator'
+      AND snapshot = (SELECT max(snapshot) FROM etl_changes)
+"""
+
+import time
+
+from .indexes import drop_indexes
+from .settings import log
+
+HD_NATURAL_KEY = ("handler_id", "activity_location", "source_type", "seq_number")
+
+NATURAL_KEYS: dict[str, tuple[str, ...]] = {
+    # HD_* tables all key on the handler record; see natural_key()
+    # ── RCRAInfo ──────────────────────────────────────────────
+    "EM_MANIFEST":                ("manifest_tracking_number",),
+    # ── ICIS-AIR ──────────────────────────────────────────────
+    # event tables key on the same columns as the notebook's *_pk identities
+    "icis_air_facilities":        ("pgm_sys_id",),
+    "icis_air_fces_pces":         ("pgm_sys_id", "activity_id", "actual_end_date"),
+    "icis_air_violation_history": ("pgm_sys_id", "activity_id", "earliest_frv_determ_date"),
+    "icis_air_formal_actions":    ("pgm_sys_id", "activity_id", "settlement_entered_date"),
+    "icis_air_informal_actions":  ("pgm_sys_id", "activity_id", "achieved_date"),
+    # ── NPDES ─────────────────────────────────────────────────
+    "water_icis_facilities":      ("npdes_id",),
+    "water_icis_permits":         ("external_permit_nmbr", "version_nmbr"),
+    "water_npdes_inspections":    ("npdes_id", "activity_id", "actual_begin_date"),
+    "water_npdes_ps_violations":  ("npdes_id", "npdes_violation_id", "rnc_detection_date"),
+    "water_npdes_cs_violations":  ("npdes_id", "npdes_violation_id", "rnc_detection_date"),
+    "water_npdes_se_violations":  ("npdes_id", "npdes_violation_id", "rnc_detection_date"),
+    "water_npdes_formal_enforcement_actions": ("npdes_id", "enf_identifier", "settlement_entered_date"),
+    # ── FRS ───────────────────────────────────────────────────
+    "national_facility_file":     ("registry_id",),
+}
+
+_BY_NAME = {k.lower(): v for k, v in NATURAL_KEYS.items()}
+
+CHANGES_DDL = """
+CREATE TABLE IF NOT EXISTS etl_changes (
+    snapshot    VARCHAR,
+    loaded_at   TIMESTAMP,
+    table_name  VARCHAR,
+    key         MAP(VARCHAR, VARCHAR),
+    change      VARCHAR,            -- insert | delete | update
+    diffs       STRUCT("column" VARCHAR, old VARCHAR, new VARCHAR)[]
+)
+"""
+
+HISTORY_VIEW = """
+CREATE OR REPLACE VIEW etl_change_history AS
+SELECT snapshot, loaded_at, table_name, key, change,
+       d."column" AS column_name, d.old AS old_value, d.new AS new_value
+FROM etl_changes
+LEFT JOIN LATERAL (SELECT unnest(diffs) AS d) ON true
+"""
+
+PREV_PREFIX = "_cdc_prev_"
+
+
+def natural_key(table: str) -> tuple[str, ...] | None:
+    if table.upper().startswith("HD_"):
+        return HD_NATURAL_KEY
+    return _BY_NAME.get(table.lower())
+
+
+def _columns(con, table: str) -> dict[str, str]:
+    return dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? AND schema_name = 'main' "
+        "ORDER BY column_index", [table]
+    ).fetchall())
+
+
+def set_aside(con, table: str) -> str | None:
+    """Rename the current copy of ``table`` so the rebuild doesn't replace it."""
+    if not _columns(con, table):
+        return None
+    if natural_key(table) is None:
+        log.info(f"🔁 [{table}] no natural key in cdc.NATURAL_KEYS — changes not recorded")
+        return None
+    prev = PREV_PREFIX + table
+    con.execute(f'DROP TABLE IF EXISTS "{prev}"')
+    drop_indexes(con, table)   # rebuilt on the new copy by indexes.finalize
+    con.execute(f'ALTER TABLE "{table}" RENAME TO "{prev}"')
+    return prev
+
+
+def capture(con, table: str, prev: str, snapshot: str) -> int:
+    """Append ``prev`` → ``table`` deltas to ``etl_changes``, drop ``prev``."""
+    t0 = time.perf_counter()
+    con.execute(CHANGES_DDL)
+    con.execute(HISTORY_VIEW)
+    old, new = _columns(con, prev), _columns(con, table)
+    keys = [k for k in natural_key(table) if k in old and k in new]
+    if not keys:
+        log.warning(f"🔁 [{table}] no natural-key columns in both snapshots — no deltas recorded")
+        con.execute(f'DROP TABLE "{prev}"')
+        return 0
+    retyped = [k for k in keys if old[k] != new[k]]
+    if retyped:
+        log.warning(f"🔁 [{table}] key columns retyped ({', '.join(retyped)}) — no deltas recorded")
+        con.execute(f'DROP TABLE "{prev}"')
+        return 0
+    row = ", ".join(f'"{k}"' for k in keys)
+    for t in (prev, table):
+        dupes = con.execute(f'SELECT count(*) - count(DISTINCT row({row})) FROM "{t}"').fetchone()[0]
+        if dupes:
+            log.warning(f"🔁 [{table}] {dupes:,} duplicate {'/'.join(keys)} keys in "
+                        f"{'previous' if t == prev else 'new'} copy — no deltas recorded")
+            con.execute(f'DROP TABLE "{prev}"')
+            return 0
+    cols = [c for c in new if c in old and c not in keys and old[c] == new[c]]
+    skipped = sorted(set(old) ^ set(new) | {c for c in new if c in old and old[c] != new[c]})
+    if skipped:
+        log.info(f"🔁 [{table}] columns added, dropped or retyped, not diffed: {', '.join(skipped)}")
+
+    key_map = "MAP {" + ", ".join(f"'{k}': \"{k}\"::VARCHAR" for k in keys) + "}"
+    diffs = "[" + ", ".join(
+        f"{{'column': '{c}', 'old': o.\"{c}\"::VARCHAR, 'new': n.\"{c}\"::VARCHAR}}" for c in cols
+    ) + "]" if cols else '[]::STRUCT("column" VARCHAR, old VARCHAR, new VARCHAR)[]'
+    n = con.execute(f"""
+        INSERT INTO etl_changes
+        SELECT ?, now(), ?, {key_map}, change,
+               CASE WHEN change = 'update' THEN diffs ELSE [] END
+        FROM (
+            SELECT {", ".join(f'COALESCE(o."{k}", n."{k}") AS "{k}"' for k in keys)},
+                   CASE WHEN o._hit IS NULL THEN 'insert'
+                        WHEN n._hit IS NULL THEN 'delete'
+                        ELSE 'update' END AS change,
+                   list_filter({diffs}, d -> d.old IS DISTINCT FROM d.new) AS diffs
+            FROM (SELECT *, true AS _hit FROM "{prev}") o
+            FULL JOIN (SELECT *, true AS _hit FROM "{table}") n
+              ON {" AND ".join(f'o."{k}" IS NOT DISTINCT FROM n."{k}"' for k in keys)}
+        )
+        WHERE change <> 'update' OR len(diffs) > 0
+    """, [snapshot, table]).fetchone()[0]
+    con.execute(f'DROP TABLE "{prev}"')
+    log.info(f"🔁 [{table}] {n:,} changed keys vs previous snapshot ({time.perf_counter() - t0:,.1f}s)")
+    return n
@@ -0,0 +1,120 @@
+"""``gov-etl``: refresh RCRAInfo / ECHO datasets without opening the notebook.
+
+Runs ``run_all`` with the same options as the gov_data ETL controls.  stdout
+carries one JSON object per line — every ETL log record as a ``log`` event,
+one ``dataset`` event per dataset and a final ``done`` event — so a nightly
+job can parse or just archive it; progress bars stay on stderr.
+
+Exit codes: 0 all datasets refreshed, 1 some failed, 3 all failed,
+4 crashed (an unexpected error outside any one dataset), 2 bad arguments,
+130 interrupted.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+
+from .scheduler import run_all
+from .settings import ECHO_DATASETS, RCRA_DATASETS, log
+
+EXIT_OK, EXIT_PARTIAL, EXIT_USAGE, EXIT_FAILED, EXIT_CRASHED, EXIT_INTERRUPTED = 0, 1, 2, 3, 4, 130
+
+
+def emit(event: str, **fields):
+    print(json.dumps({"event": event, "ts": datetime.now().isoformat(timespec="seconds"), **fields},
+                     default=str), flush=True)
+
+
+class JsonLinesHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord):
+        emit("log", level=record.levelname.lower(), msg=record.getMessage(), thread=record.threadName)
+
+
+def _pick(names: list[str] | None, known: dict, flag: str, parser) -> list[str]:
+    if not names:
+        return []
+    if "all" in names:
+        return list(known)
+    unknown = [n for n in names if n not in known]
+    if unknown:
+        parser.error(f"{flag}: unknown dataset(s) {unknown}; choose from {list(known)} or 'all'")
+    return names
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="gov-etl", description=__doc__.splitlines()[0],
+                                formatter_class=argparse.RawDescriptionHelpFormatter,
+                                epilog="Exit codes: 0 ok, 1 some datasets failed, 3 all failed, 4 crashed, 2 usage, "
+                                       "130 interrupted.")
+    p.add_argument("--rcra", nargs="+", metavar="KEY", help=f"RCRAInfo modules ({', '.join(RCRA_DATASETS)}) or 'all'")
+    p.add_argument("--echo", nargs="+", metavar="KEY", help=f"ECHO dumps ({', '.join(ECHO_DATASETS)}) or 'all'")
+    p.add_argument("--workers", type=int, default=4, help="parallel downloads (default 4)")
+    p.add_argument("--stream", action="store_true", help="ingest CSVs straight from the zips")
+    p.add_argument("--full", action="store_true", help="ignore etl_manifest and reload everything")
+    p.add_argument("--skip-download", action="store_true", help="reuse what is already on disk")
+    p.add_argument("--typed", action="store_true", help="cast columns per schemas.TABLE_SCHEMAS")
+    p.add_argument("--memory-limit", metavar="SIZE", help="DuckDB memory limit per writer, e.g. 4GB")
+    p.add_argument("--threads", type=int, help="DuckDB threads per CSV scan")
+    p.add_argument("--no-cluster", action="store_true", help="don't sort tables by their hot keys")
+    p.add_argument("--no-index", action="store_true", help="skip ART indexes / ANALYZE")
+    p.add_argument("--no-changes", action="store_true", help="don't record etl_changes deltas")
+    p.add_argument("--no-parquet", action="store_true", help="don't refresh the Parquet tier")
+    p.add_argument("-q", "--quiet", action="store_true", help="only emit dataset/done events, no log events")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    rcra = _pick(args.rcra, RCRA_DATASETS, "--rcra", parser)
+    echo = _pick(args.echo, ECHO_DATASETS, "--echo", parser)
+    if not rcra and not echo:
+        parser.error("nothing to do: pass --rcra and/or --echo")
+
+    # JSON lines on stdout; keep a plain-text copy of the log on stderr
+    stderr = logging.StreamHandler(sys.stderr)
+    stderr.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    handlers = [stderr] if args.quiet else [stderr, JsonLinesHandler()]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    for h in handlers:
+        log.addHandler(h)
+
+    emit("start", rcra=rcra, echo=echo, argv=sys.argv[1:] if argv is None else argv)
+    t0 = time.perf_counter()
+    try:
+        results = run_all(
+            rcra=rcra, echo=echo, workers=args.workers, skip_download=args.skip_download,
+            stream=args.stream, incremental=not args.full, typed=args.typed,
+            cluster=not args.no_cluster, threads=args.threads, changes=not args.no_changes,
+            parquet=not args.no_parquet, memory_limit=args.memory_limit, index=not args.no_index,
+        )
+    except KeyboardInterrupt:
+        emit("done", status="interrupted", seconds=round(time.perf_counter() - t0, 1))
+        return EXIT_INTERRUPTED
+    except Exception as e:   # run_all or a publish step blew up, not one dataset
+        log.exception(f"gov-etl crashed: {type(e).__name__}: {e}")
+        emit("done", status="crashed", error=f"{type(e).__name__}: {e}",
+             seconds=round(time.perf_counter() - t0, 1), exit_code=EXIT_CRASHED)
+        return EXIT_CRASHED
+    finally:
+        for h in handlers:
+            log.removeHandler(h)
+
+    for key, err in results.items():
+        emit("dataset", key=key, status="ok" if err is None else "error",
+             error=None if err is None else f"{type(err).__name__}: {err}")
+    failed = [k for k, e in results.items() if e is not None]
+    ok = len(results) - len(failed)
+    code = EXIT_OK if not failed else EXIT_FAILED if ok == 0 else EXIT_PARTIAL
+    status = {EXIT_OK: "ok", EXIT_PARTIAL: "partial", EXIT_FAILED: "failed"}[code]
+    emit("done", status=status, ok=ok, failed=failed,
+         seconds=round(time.perf_counter() - t0, 1), exit_code=code)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Typed DATE columns derived at load time for the analysis date windows.
+
+ECHO tables land as VARCHAR, so ``run_echo_analysis`` used to filter with
+``strptime(actual_end_date, ...) BETWEEN ...``: every row parsed on every
+analysis, and nothing for the zone maps to prune on.  ``add_dates`` adds a
+``<column>_dt`` DATE next to each column in ``DATE_COLUMNS`` (parsed with
+the formats ``schemas.TABLE_SCHEMAS`` declares for it; values that don't
+parse are NULL) in the same rewrite that sorts the table, and
+``layout.CLUSTER_KEYS`` leads with that column, so a date-window filter
+reads only the row groups it overlaps.  The VARCHAR originals are kept.
+
+In typed mode the source column is already a DATE and is copied as is.
+Tables loaded before their derived columns existed are picked up by
+``stale`` and rewritten on the next ingest into that database.
+"""
+
+from .layout import order_by_sql
+from .schemas import cast_sql, schema_for
+from .settings import log
+
+SUFFIX = "_dt"
+
+DATE_COLUMNS: dict[str, tuple[str, ...]] = {
+    # ── ICIS-AIR ──────────────────────────────────────────────
+    "icis_air_fces_pces":         ("actual_end_date",),
+    "icis_air_violation_history": ("earliest_frv_determ_date", "hpv_resolved_date"),
+    "icis_air_formal_actions":    ("settlement_entered_date",),
+    "icis_air_informal_actions":  ("achieved_date",),
+    # ── NPDES ─────────────────────────────────────────────────
+    "water_npdes_inspections":    ("actual_begin_date",),
+    "water_npdes_ps_violations":  ("rnc_detection_date", "rnc_resolution_date"),
+    "water_npdes_cs_violations":  ("rnc_detection_date", "rnc_resolution_date"),
+    "water_npdes_se_violations":  ("rnc_detection_date", "rnc_resolution_date"),
+    "water_npdes_formal_enforcement_actions": ("settlement_entered_date",),
+}
+
+_BY_NAME = {k.lower(): v for k, v in DATE_COLUMNS.items()}
+
+
+def date_columns(table: str) -> tuple[str, ...] | None:
+    return _BY_NAME.get(table.lower())
+
+
+def _types(con, table: str) -> dict[str, str]:
+    return dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? AND schema_name = 'main' "
+        "ORDER BY column_index", [table],
+    ).fetchall())
+
+
+def add_dates(con, table: str, order_by=None) -> list[str]:
+    """Rewrite ``table`` with its ``<column>_dt`` DATE columns (replacing any); returns their names.
+
+    ``order_by`` keys, which may name the derived columns, are applied in
+    the same rewrite.  Keys whose column isn't there (a source date column
+    renamed upstream) are logged and left out; the table is still sorted by
+    the rest even when there is nothing to derive.
+    """
+    types = _types(con, table)
+    cols = [c for c in date_columns(table) or () if c in types]
+    missing = [c for c in date_columns(table) or () if c not in types]
+    if missing:
+        log.warning(f"[{table}] date columns not in table: {missing}")
+    spec = schema_for(table)
+    derived = {c + SUFFIX: (f'"{c}"' if types[c] == "DATE" else cast_sql(c, spec[c])) for c in cols}
+    keep = [c for c in types if c not in derived]
+    keys = [k for k in order_by or () if k in keep or k in derived]
+    if len(keys) < len(order_by or ()):
+        log.warning(f"[{table}] not sorted on {[k for k in order_by if k not in keys]}: not in table")
+    if not derived and not keys:
+        return []
+    select = ", ".join([f'"{c}"' for c in keep] + [f'{expr} AS "{name}"' for name, expr in derived.items()])
+    con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT {select} FROM "{table}"'
+                f'{order_by_sql(tuple(keys))}')
+    return list(derived)
+
+
+def stale(con) -> list[str]:
+    """Tables in ``con`` that are missing one of their derived date columns."""
+    out = []
+    for table, cols in DATE_COLUMNS.items():
+        types = _types(con, table)
+        if any(c in types and c + SUFFIX not in types for c in cols):
+            out.append(table)
+    return out
@@ -0,0 +1,123 @@
+"""Find the newest published RCRAInfo ``CSV-{date}`` snapshot.
+
+EPA usually publishes on Monday at ``03-00-00-0400``, but not always: a late
+week lands on Tuesday, and outside daylight-saving time the offset is
+``-0500``.  Rather than guess one stamp, ``snapshot_stamp`` HEADs each
+candidate prefix (newest first) for the dataset's own URL and takes the first
+one that answers 200.  The winner is cached per dataset in
+``SNAPSHOT_STAMPS`` so later runs only probe days from its own onwards (and
+the cached stamp itself, even past the lookback), and a run inside
+``STAMP_TTL`` of the last check doesn't probe at all.
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import requests
+
+from .settings import (
+    RCRA_DATASETS,
+    SNAPSHOT_LOOKBACK_DAYS,
+    SNAPSHOT_STAMPS,
+    SNAPSHOT_TIMES,
+    STAMP_TTL,
+    log,
+)
+
+_lock = threading.Lock()
+
+
+class SnapshotNotFound(LookupError):
+    pass
+
+
+def candidate_stamps(today: date | None = None, days: int = SNAPSHOT_LOOKBACK_DAYS,
+                     times=SNAPSHOT_TIMES) -> list[str]:
+    """Every ``YYYY-MM-DDT<time>`` stamp in the last ``days`` days, newest first."""
+    today = today or date.today()
+    return [f"{today - timedelta(days=d):%Y-%m-%d}T{t}" for d in range(days + 1) for t in times]
+
+
+def _read_cache() -> dict:
+    try:
+        return json.loads(SNAPSHOT_STAMPS.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_cache(key: str, stamp: str):
+    with _lock:  # run_all stages several RCRA modules at once
+        cache = _read_cache()
+        cache[key] = {"stamp": stamp, "checked_at": datetime.now().isoformat(timespec="seconds")}
+        SNAPSHOT_STAMPS.parent.mkdir(parents=True, exist_ok=True)
+        tmp = SNAPSHOT_STAMPS.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, indent=2, sort_keys=True))
+        os.replace(tmp, SNAPSHOT_STAMPS)
+
+
+def cached_stamp(key: str) -> str | None:
+    """Last stamp ``snapshot_stamp`` found for ``key``, without probing."""
+    return (_read_cache().get(key) or {}).get("stamp")
+
+
+def _published(url: str) -> bool | None:
+    """True/False for a 200/other answer, None when the HEAD itself failed."""
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=15)
+    except requests.RequestException as e:
+        log.debug(f"HEAD {url} failed: {e}")
+        return None
+    return r.status_code == 200  # S3 answers 403, not 404, for a missing key
+
+
+def _day(stamp: str) -> date:
+    return date.fromisoformat(stamp[:10])
+
+
+def _probe_order(candidates: list[str], cached: str | None, refresh: bool) -> list[str]:
+    """``candidates`` no older than the cached stamp's day, then the cached stamp itself.
+
+    Compared by day, not as strings: ``…T03-00-00-0400`` sorts before
+    ``…T03-00-00-0500`` for the same date.
+    """
+    if cached is None:
+        return candidates
+    stamps = candidates if refresh else [s for s in candidates if _day(s) >= _day(cached)]
+    return stamps + ([cached] if cached not in stamps else [])
+
+
+def snapshot_stamp(key: str, refresh=False, today: date | None = None) -> str:
+    """Newest snapshot stamp that actually has ``RCRA_DATASETS[key]``.
+
+    Raises ``SnapshotNotFound`` when nothing in the lookback window answers,
+    unless the probes only failed on the network and a cached stamp exists,
+    in which case that stamp is reused.
+    """
+    if key not in RCRA_DATASETS:
+        raise ValueError(f"Choose from {list(RCRA_DATASETS)}")
+    cached = _read_cache().get(key)
+    if cached and not refresh:
+        age = datetime.now() - datetime.fromisoformat(cached["checked_at"])
+        if age < STAMP_TTL:
+            return cached["stamp"]
+
+    template = RCRA_DATASETS[key]
+    errors = probes = 0
+    for stamp in _probe_order(candidate_stamps(today), cached["stamp"] if cached else None, refresh):
+        probes += 1
+        ok = _published(template.format(date=stamp))
+        if ok:
+            log.info(f"[{key}] newest snapshot is {stamp} ({probes} probes)")
+            _write_cache(key, stamp)
+            return stamp
+        errors += ok is None
+
+    if cached and errors == probes:
+        log.warning(f"[{key}] snapshot probes failed; reusing cached {cached['stamp']}")
+        return cached["stamp"]
+    raise SnapshotNotFound(
+        f"[{key}] no CSV-{{date}} snapshot in the last {SNAPSHOT_LOOKBACK_DAYS} days "
+        f"({probes} stamps probed, {errors} network errors)"
+    )
@@ -0,0 +1,143 @@
+"""Contact-email domain lookups materialised at ETL time.
+
+The notebooks used to derive "which handlers have a contact at
+``acme.com``" on every open by unioning five ``HD_*`` tables and splitting
+each email.  ``build_handler_domain`` runs after the ``hd`` dataset loads
+and keeps the answer in ``handler_domain``:
+
+``handler_domain``
+    ``(handler_id, domain, source_table, current_handler)``, one row per
+    distinct tuple.  ``domain`` is the lower-cased part after ``@`` (the
+    notebooks always compared domains case-insensitively).  Rows come from
+    current ``HD_HANDLER`` records and every row of the other
+    ``DOMAIN_SOURCES`` tables; ``current_handler`` says whether the row
+    matches a current ``HD_HANDLER`` record on the handler record key, so
+    ``gov_data`` keeps only those while ``account_rcra`` takes every
+    certification.  Sorted by ``domain`` and indexed on ``domain`` and
+    ``handler_id``.
+
+``echo_domain``
+    Built by ``build_echo_domain`` after the ECHO ``frs`` dump loads: one
+    row per ``domain`` with the sorted, distinct ``registry_ids`` whose
+    contact or organisation emails use it.  Indexed on ``domain``, so a
+    prospect lookup is a single-row probe.
+
+Only the sources whose tables were reloaded are recomputed; the rest of
+``handler_domain`` is carried over from the previous snapshot.  A reload of
+``HD_HANDLER`` recomputes everything, since every source joins to it.
+``echo_domain`` is rebuilt whenever either FRS contact file was reloaded.
+"""
+
+from . import indexes
+from .settings import log
+
+# source table -> its email column; all but HD_HANDLER are matched to current HD_HANDLER records
+DOMAIN_SOURCES = {
+    "HD_HANDLER":        "contact_email_address",
+    "HD_CERTIFICATION":  "cert_email",
+    "HD_REPORTING":      "contact_email_address",
+    "HD_OWNER_OPERATOR": "email",
+    "HD_HADDL_CONTACT":  "addl_contact_email_address",
+}
+HANDLER_RECORD_KEY = ("handler_id", "activity_location", "source_type", "seq_number")
+
+# FRS tables with (registry_id, email_address)
+ECHO_DOMAIN_SOURCES = ("national_contact_file", "national_organization_file")
+
+HANDLER_DOMAIN = "handler_domain"
+ECHO_DOMAIN    = "echo_domain"
+
+
+def domain_sql(email: str) -> str:
+    """SQL for the normalised domain of the ``email`` expression."""
+    return f"lower(split_part({email}::VARCHAR, '@', 2))"
+
+
+def _columns(con, table: str) -> set[str]:
+    return {r[0] for r in con.execute(
+        "SELECT column_name FROM duckdb_columns() WHERE table_name = ? AND schema_name = 'main'", [table]
+    ).fetchall()}
+
+
+def _source_sql(table: str, col: str) -> str:
+    if table == "HD_HANDLER":
+        rows, current = 'FROM "HD_HANDLER" s WHERE s.current_record = \'Y\'', "true"
+    else:
+        keys = ", ".join(HANDLER_RECORD_KEY)
+        on = " AND ".join(f"s.{k} = h.{k}" for k in HANDLER_RECORD_KEY)
+        rows = (f'FROM "{table}" s LEFT JOIN (SELECT DISTINCT {keys} FROM "HD_HANDLER" '
+                f"WHERE current_record = 'Y') h ON {on}")
+        current = "h.handler_id IS NOT NULL"
+    return f"""
+        SELECT DISTINCT s.handler_id::VARCHAR AS handler_id,
+               {domain_sql(f's.{col}')} AS domain,
+               '{table}' AS source_table,
+               {current} AS current_handler
+        {rows}"""
+
+
+def build_handler_domain(con, tables: list[str] | None = None) -> int | None:
+    """Refresh ``handler_domain`` for the reloaded ``tables`` (None: all); returns its row count."""
+    if not {"handler_id", "current_record"} | set(HANDLER_RECORD_KEY) <= _columns(con, "HD_HANDLER"):
+        log.warning("📧 HD_HANDLER missing or unrecognised — skipping handler_domain")
+        return None
+    exists = "current_handler" in _columns(con, HANDLER_DOMAIN)   # else built before the flag: rebuild
+    if not exists or tables is None or "HD_HANDLER" in tables:
+        refresh = list(DOMAIN_SOURCES)
+    else:
+        refresh = [t for t in DOMAIN_SOURCES if t in tables]
+    if not refresh:
+        return None
+
+    parts = []
+    if exists and len(refresh) < len(DOMAIN_SOURCES):
+        done = ", ".join(f"'{t}'" for t in refresh)
+        parts.append(f"SELECT * FROM {HANDLER_DOMAIN} WHERE source_table NOT IN ({done})")
+    for t in refresh:
+        cols = _columns(con, t)
+        if {DOMAIN_SOURCES[t], *HANDLER_RECORD_KEY} <= cols:
+            parts.append(_source_sql(t, DOMAIN_SOURCES[t]))
+        elif cols:
+            log.warning(f"📧 {t} has no {DOMAIN_SOURCES[t]} / handler record key — left out of {HANDLER_DOMAIN}")
+    if not parts:
+        parts.append("SELECT NULL::VARCHAR AS handler_id, NULL::VARCHAR AS domain, NULL::VARCHAR AS source_table, "
+                     "NULL::BOOLEAN AS current_handler WHERE false")
+
+    union = "\nUNION ALL\n".join(parts)
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {HANDLER_DOMAIN} AS
+        SELECT handler_id, domain, source_table, current_handler FROM ({union})
+        WHERE handler_id IS NOT NULL AND domain IS NOT NULL AND domain <> ''
+        ORDER BY domain, handler_id
+    """)
+    indexes.finalize(con, HANDLER_DOMAIN)
+    n = con.execute(f"SELECT count(*) FROM {HANDLER_DOMAIN}").fetchone()[0]
+    log.info(f"📧 {HANDLER_DOMAIN}: {n:,} handler/domain rows (refreshed {', '.join(refresh)})")
+    return n
+
+
+def build_echo_domain(con, tables: list[str] | None = None) -> int | None:
+    """Rebuild ``echo_domain`` if a contact file was reloaded (``tables`` None: always); returns its row count."""
+    if tables is not None and _columns(con, ECHO_DOMAIN) and not set(ECHO_DOMAIN_SOURCES) & set(tables):
+        return None
+    sources = [t for t in ECHO_DOMAIN_SOURCES if {"registry_id", "email_address"} <= _columns(con, t)]
+    if not sources:
+        log.warning("📧 FRS contact/organization files missing or unrecognised — skipping echo_domain")
+        return None
+
+    union = "\nUNION ALL\n".join(
+        f"SELECT trim(registry_id::VARCHAR) AS registry_id, {domain_sql('email_address')} AS domain FROM {t}"
+        for t in sources
+    )
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {ECHO_DOMAIN} AS
+        SELECT domain, list_sort(list(DISTINCT registry_id)) AS registry_ids
+        FROM ({union})
+        WHERE NULLIF(registry_id, '') IS NOT NULL AND domain IS NOT NULL AND domain NOT IN ('', '0.0')
+        GROUP BY domain
+        ORDER BY domain
+    """)
+    indexes.finalize(con, ECHO_DOMAIN)
+    n = con.execute(f"SELECT count(*) FROM {ECHO_DOMAIN}").fetchone()[0]
+    log.info(f"📧 {ECHO_DOMAIN}: {n:,} domains from {', '.join(sources)}")
+    return n
@@ -0,0 +1,465 @@
+"""Download, unzip and DuckDB ingest steps for the RCRAInfo and ECHO dumps."""
+
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime, timedelta
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+
+import duckdb
+from tqdm.auto import tqdm
+
+from . import cdc, derived, domains, export, frs, headers, indexes, layout, manifest, schemas, snapshots
+from .timing import Timings
+from .discover import cached_stamp, snapshot_stamp
+from .fetch import download
+from .headers import snake
+from .settings import (
+    DATA_ROOT,
+    ECHO_DATASETS,
+    ECHO_DB_PATH,
+    INGEST_CHUNK_FILES,
+    INGEST_MEMORY_LIMIT,
+    INGEST_TEMP_DIR,
+    INGEST_THREADS,
+    RAW_DATA_DIR,
+    RCRA_DATASETS,
+    RCRA_DB_PATH,
+    log,
+)
+from .zipstream import ZipMember, ZipSource, list_zip_members
+
+# ────────────────────────────────
+# Helpers
+# ────────────────────────────────
+def latest_monday_stamp() -> str:
+    monday = datetime.now() - timedelta(days=datetime.now().weekday())
+    return monday.strftime("%Y-%m-%dT03-00-00-0400")
+
+def unzip_recursive(zfile: Path, dest: Path):
+    dest.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(zfile) as z:
+        z.extractall(dest)
+    for p in dest.rglob("*.zip"):
+        subdir = p.with_suffix('')
+        unzip_recursive(p, subdir)
+        p.unlink()  # remove nested zip
+
+def _sql_str(v) -> str:
+    return "'" + str(v).replace("'", "''") + "'"
+
+def _throughput(table: str, rows: int, nbytes: int, secs: float):
+    secs = max(secs, 1e-9)
+    log.info(f"⏱️  [{table}] {rows:,} rows, {nbytes / 2**20:,.1f} MB in {secs:,.1f}s — "
+             f"{rows / secs:,.0f} rows/s, {nbytes / 2**20 / secs:,.1f} MB/s")
+
+def sniff_dialect(con, csv_path: Path) -> tuple[str, str, str]:
+    """Delimiter, quote and read_csv dialect options, sniffed from one file."""
+    delim, quote, escape, header = con.execute(
+        f"SELECT Delimiter, Quote, Escape, HasHeader FROM sniff_csv({_sql_str(csv_path)})"
+    ).fetchone()
+    opts = [f"delim={_sql_str(delim)}", f"header={str(bool(header)).lower()}"]
+    opts += [f"{k}={_sql_str(v)}" for k, v in (("quote", quote), ("escape", escape)) if v and v != "(empty)"]
+    quote = quote if quote and quote != "(empty)" else '"'
+    return delim, quote, ", ".join(opts)
+
+def load_csvs(con, csvs: list[Path], table: str, bar=None, order_by=None,
+              threads: int | None = INGEST_THREADS, timings: Timings | None = None,
+              chunk_files: int | None = None) -> int:
+    """Load ``csvs`` into ``table`` with as few multi-file scans as possible.
+
+    The dialect is sniffed once from the first file and every file's header
+    is reconciled by ``headers.unify`` (drift lands in ``schema_history``).
+    Files sharing a header are read in a single ``read_csv([...])`` so DuckDB
+    parallelises across them; columns a file lacks come back NULL.  With
+    ``chunk_files`` the files are instead inserted ``chunk_files`` at a time,
+    which bounds what one statement holds in memory.  When more than one
+    statement was needed the table is sorted afterwards.
+    """
+    if not csvs:
+        return 0
+    timings = timings or Timings(table)
+    t0 = time.perf_counter()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    nbytes = sum(f.stat().st_size for f in csvs)
+    with timings.stage("sniff", table):
+        delim, quote, dialect = sniff_dialect(con, csvs[0])
+    with timings.stage("headers", table):
+        u = headers.unify([headers.read_file_header(f, delim, quote) for f in csvs])
+        headers.record(con, table, u)
+    step = chunk_files or len(csvs)
+    parts = [g[i:i + step] for g in u.groups() for i in range(0, len(g), step)]
+    with timings.stage("ingest", table, nbytes) as load:
+        for i, part in enumerate(parts):
+            names = ", ".join(_sql_str(c) for c in u.names[part[0]])
+            src = (f"read_csv([{', '.join(_sql_str(csvs[j]) for j in part)}], {dialect}, "
+                   f"names=[{names}], all_varchar=true)")
+            if i == 0:
+                sort = layout.order_by_sql(order_by) if len(parts) == 1 else ""
+                con.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT {u.select(part[0])} FROM {src}{sort}")
+            else:
+                con.execute(f"INSERT INTO {table} SELECT {u.select(part[0])} FROM {src}")
+    if order_by and len(parts) > 1:
+        with timings.stage("cluster", table):
+            layout.sort_table(con, table, order_by)
+    with timings.stage("count", table) as count:
+        n = count["rows"] = load["rows"] = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    _throughput(table, n, nbytes, time.perf_counter() - t0)
+    if bar:
+        bar.set_postfix_str(f"{table}  {n:,} rows")
+        bar.update(len(csvs))
+    return len(csvs)
+
+def load_members(con, members: list[ZipMember], table: str, bar=None, order_by=None,
+                 timings: Timings | None = None) -> int:
+    """Like ``load_csvs`` but reads each CSV straight out of its zip archive."""
+    if not members:
+        return 0
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    timings = timings or Timings(table)
+    nbytes = sum(m.size for m in members)
+    t0 = time.perf_counter()
+    with ZipSource(members[0].archive) as src:
+        with timings.stage("headers", table):
+            raw = []
+            for m in members:
+                with src.open(m) as f:
+                    raw.append(headers.read_header(f))
+            u = headers.unify(raw)
+            headers.record(con, table, u)
+        with timings.stage("ingest", table, nbytes) as load:
+            for i, m in enumerate(members):
+                with src.open(m) as f:
+                    reader = pacsv.open_csv(
+                        f,
+                        read_options=pacsv.ReadOptions(block_size=16 << 20, column_names=u.names[i], skip_rows=1),
+                        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                        convert_options=pacsv.ConvertOptions(
+                            column_types={c: pa.string() for c in u.names[i]},
+                            strings_can_be_null=True,
+                        ),
+                    )
+                    con.register("_csv_stream", reader)
+                    try:
+                        if i == 0:
+                            con.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT {u.select(i)} FROM _csv_stream")
+                        else:
+                            con.execute(f"INSERT INTO {table} SELECT {u.select(i)} FROM _csv_stream")
+                    finally:
+                        con.unregister("_csv_stream")
+    if order_by:
+        with timings.stage("cluster", table):
+            layout.sort_table(con, table, order_by)
+    with timings.stage("count", table) as count:
+        n = count["rows"] = load["rows"] = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    _throughput(table, n, nbytes, time.perf_counter() - t0)
+    if bar:
+        bar.set_postfix_str(f"{table}  {n:,} rows")
+        bar.update(len(members))
+    return len(members)
+
+@contextmanager
+def disk_watermark(label: str, path: Path = DATA_ROOT, every: float = 0.5):
+    """Log the peak growth of used bytes on ``path``'s filesystem during the block."""
+    path = path if path.exists() else Path.home()
+    base = peak = shutil.disk_usage(path).used
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(every):
+            peak = max(peak, shutil.disk_usage(path).used)
+
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        done.set(); t.join()
+        peak = max(peak, shutil.disk_usage(path).used)
+        log.info(f"💾 [{label}] peak disk usage +{(peak - base) / 2**30:,.2f} GiB")
+
+@contextmanager
+def rss_watermark(label: str, every: float = 0.5):
+    """Log this process's peak resident memory during the block.
+
+    Sampled with psutil when it is installed; otherwise falls back to
+    ``getrusage``, which only knows the peak over the process lifetime.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is None:
+        try:
+            yield
+        finally:
+            import resource
+            import sys
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak *= 1 if sys.platform == "darwin" else 1024   # bytes on macOS, KiB on Linux
+            log.info(f"🧠 [{label}] peak RSS {peak / 2**30:,.2f} GiB (process lifetime)")
+        return
+
+    proc = psutil.Process()
+    peak = proc.memory_info().rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(every):
+            peak = max(peak, proc.memory_info().rss)
+
+    t = threading.Thread(target=sample, daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        done.set(); t.join()
+        peak = max(peak, proc.memory_info().rss)
+        log.info(f"🧠 [{label}] peak RSS {peak / 2**30:,.2f} GiB")
+
+# dataset -> fns(con, reloaded tables) run after its tables load, for tables derived from them
+POST_INGEST = {
+    "frs": (frs.build, domains.build_echo_domain),
+    "hd":  (domains.build_handler_domain,),
+}
+
+class Staged(NamedTuple):
+    dataset: str
+    tables: list[tuple[str, list]]     # (table, extracted csv paths | ZipMembers) to (re)build
+    source: dict | None = None         # remote_meta() of the archive
+    hashes: dict[str, list] = {}       # every table's member hashes, for etl_manifest
+    timings: Timings | None = None     # download/extract so far; ingest appends the rest
+
+def ingest(db_path: Path, staged: Staged, desc="Ingest", typed=False, cluster=True,
+           threads: int | None = INGEST_THREADS, changes=True,
+           memory_limit: str | None = INGEST_MEMORY_LIMIT, index=True) -> int:
+    """Write staged tables into ``db_path`` over one connection.
+
+    Table inputs are extracted file paths, or ``ZipMember``s in streaming
+    mode.  With ``typed`` each table listed in ``schemas.TABLE_SCHEMAS`` is
+    cast once after loading.  Tables in ``derived.DATE_COLUMNS`` get their
+    ``<column>_dt`` DATE columns, as do any already in the database that
+    predate them.  With ``cluster`` tables in
+    ``layout.CLUSTER_KEYS`` are written sorted by their hot keys and the
+    resulting zone-map pruning is logged.  With ``index`` each table gets the
+    ART indexes in ``indexes.INDEX_KEYS`` plus ``ANALYZE``, and its point
+    lookups are checked to plan as index scans.  With ``changes`` tables that have
+    a ``cdc.natural_key`` get their deltas against the copy being replaced
+    appended to ``etl_changes``.  ``etl_manifest`` is rewritten for the
+    dataset once every table has loaded (after any ``POST_INGEST`` step) and
+    left alone when nothing was hashed (``skip_download``), and
+    the per-stage timings are appended to ``etl_runs``.
+
+    ``memory_limit`` (e.g. ``"4GB"``) caps DuckDB for this connection, spills
+    to ``INGEST_TEMP_DIR`` past it, drops insertion-order preservation and
+    loads extracted CSVs ``INGEST_CHUNK_FILES`` at a time.
+    """
+    timings = staged.timings or Timings(staged.dataset)
+    total_files = sum(len(csvs) for _, csvs in staged.tables)
+    with rss_watermark(desc), duckdb.connect(db_path) as con, \
+            tqdm(total=total_files, desc=desc, unit="file") as bar:
+        chunk_files = None
+        if memory_limit:
+            INGEST_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+            con.execute(f"SET memory_limit = {_sql_str(memory_limit)}")
+            con.execute(f"SET temp_directory = {_sql_str(INGEST_TEMP_DIR)}")
+            con.execute("SET preserve_insertion_order = false")
+            chunk_files = INGEST_CHUNK_FILES
+        for name, csvs in staged.tables:
+            if not csvs:
+                continue
+            streamed = isinstance(csvs[0], ZipMember)
+            csv_loader = partial(load_csvs, threads=threads, chunk_files=chunk_files)
+            load = partial(load_members if streamed else csv_loader, timings=timings)
+            keys = layout.cluster_keys(name) if cluster else None
+            spec = schemas.schema_for(name) if typed else None
+            dates = derived.date_columns(name)
+            sort = None if dates else keys   # tables with derived dates sort by them, below
+            prev = cdc.set_aside(con, name) if changes else None
+            if spec:  # cast and sort in the same rewrite
+                load(con, csvs, name, bar)
+                with timings.stage("typed", name):
+                    schemas.apply_schema(con, name, spec, order_by=sort)
+            else:
+                load(con, csvs, name, bar, order_by=sort)
+            if dates:
+                with timings.stage("derive", name):
+                    derived.add_dates(con, name, order_by=keys)
+            if keys:
+                layout.zone_map_report(con, name, keys)
+            if index:
+                indexes.finalize(con, name, timings=timings)
+            if prev:
+                with timings.stage("cdc", name):
+                    cdc.capture(con, name, prev, db_path.stem)
+        for name in derived.stale(con) if staged.tables else ():   # loaded before its date columns existed
+            with timings.stage("derive", name):
+                derived.add_dates(con, name, order_by=layout.cluster_keys(name) if cluster else None)
+            if index:
+                indexes.finalize(con, name, timings=timings)
+        if staged.tables and staged.dataset in POST_INGEST:
+            with timings.stage("derive"):
+                for derive in POST_INGEST[staged.dataset]:
+                    derive(con, [t for t, _ in staged.tables])
+        if staged.tables and staged.hashes:   # a skip_download run has no hashes; keep the old rows
+            manifest.record(con, staged.dataset, staged.source, staged.hashes)
+        if staged.tables:
+            timings.record(con, db_path.stem)
+    return len(staged.tables)
+
+def _timed_download(timings: Timings, url: str, to: Path):
+    with timings.stage("download", nbytes=0) as rec:
+        download(url, to)
+        rec["bytes"] = to.stat().st_size
+
+def _timed_unzip(timings: Timings, zfile: Path, dest: Path):
+    with timings.stage("extract", nbytes=zfile.stat().st_size):
+        unzip_recursive(zfile, dest)
+
+def _incremental(db_path: Path, dataset: str, url: str, incremental: bool):
+    """Previous manifest + remote headers; ``None`` manifest when not incremental."""
+    if not incremental:
+        return None, manifest.remote_meta(url)
+    return manifest.read_manifest(db_path, dataset), manifest.remote_meta(url)
+
+def _skip_unchanged(dataset: str, prev, tables: list[tuple[str, list]], hashes: dict) -> list[tuple[str, list]]:
+    if not prev:
+        return tables
+    keep = [(t, csvs) for t, csvs in tables if not manifest.table_unchanged(prev, t, hashes.get(t, []))]
+    skipped = len(tables) - len(keep)
+    if skipped:
+        log.info(f"[{dataset}] {skipped} unchanged tables skipped, {len(keep)} to rebuild")
+    return keep
+
+# ────────────────────────────────
+# RCRA ETL
+# ────────────────────────────────
+def _rcra_tables(key: str, members: list[ZipMember]) -> dict[str, list[ZipMember]]:
+    """Group CSV members by top-level directory, like ``stage_rcra`` does on disk."""
+    members = [m for m in members if m.path.suffix == ".csv"]
+    dirs = sorted({m.path.parts[0] for m in members if len(m.path.parts) > 1})
+    if not dirs:
+        return {key: members}
+    return {d: [m for m in members if m.path.parent == PurePosixPath(d)] for d in dirs}
+
+def stage_rcra(key: str, skip_download=False, stream=False, incremental=True) -> Staged:
+    """Download + unzip one RCRA module; return the tables it will (re)build.
+
+    With ``stream=True`` the archive is kept as-is and the tables list zip
+    members instead of extracted files.  With ``incremental`` the download
+    is skipped when the source is unchanged, and so is every table whose
+    CSV members hash the same as last time.
+    """
+    if key not in RCRA_DATASETS:
+        raise ValueError(f"Choose from {list(RCRA_DATASETS)}")
+
+    # the --skip-download path reuses whatever was fetched last, no probing
+    date   = (cached_stamp(key) or latest_monday_stamp()) if skip_download else snapshot_stamp(key)
+    url    = RCRA_DATASETS[key].format(date=date)
+    raw    = RAW_DATA_DIR / key / date
+    zfile  = RAW_DATA_DIR / f"{key}.zip"
+
+    log.info(f"[{key}] snapshot {date}")
+    timings = Timings(key)
+
+    prev, meta = (None, None) if skip_download else _incremental(RCRA_DB_PATH, key, url, incremental)
+    if prev and manifest.source_unchanged(prev, meta):
+        log.info(f"[{key}] source unchanged since last load — skipping")
+        return Staged(key, [], meta)
+
+    if stream:
+        if not skip_download:
+            _timed_download(timings, url, zfile)
+        elif not zfile.exists():
+            raise FileNotFoundError(zfile)
+        groups = _rcra_tables(key, list_zip_members(zfile))
+        hashes = {t: manifest.member_hashes(ms) for t, ms in groups.items()}
+        return Staged(key, _skip_unchanged(key, prev, list(groups.items()), hashes), meta, hashes, timings)
+
+    hashes = {}
+    if not skip_download:
+        _timed_download(timings, url, zfile)
+        hashes = {t: manifest.member_hashes(ms) for t, ms in _rcra_tables(key, list_zip_members(zfile)).items()}
+        if raw.exists(): shutil.rmtree(raw)
+        _timed_unzip(timings, zfile, raw)
+        zfile.unlink()
+
+    targets = sorted([d for d in raw.iterdir() if d.is_dir()]) or [raw]
+    tables = [(d.name if d != raw else key, list(d.glob("*.csv"))) for d in targets]
+    return Staged(key, _skip_unchanged(key, prev, tables, hashes), meta, hashes, timings)
+
+def run_etl(key: str, skip_download=False, stream=False, incremental=True, typed=False, cluster=True,
+            changes=True, parquet=True, memory_limit: str | None = INGEST_MEMORY_LIMIT, index=True):
+    with disk_watermark(key):
+        staged = stage_rcra(key, skip_download, stream, incremental)
+        if staged.tables:
+            with snapshots.build(RCRA_DB_PATH) as db:
+                ingest(db, staged, typed=typed, cluster=cluster, changes=changes, memory_limit=memory_limit,
+                       index=index)
+            if parquet:
+                export.export_tables(RCRA_DB_PATH, [t for t, _ in staged.tables])
+    log.info(f"✅  ETL done for '{key}' — {len(staged.tables)} tables ingested")
+
+# ────────────────────────────────
+# ECHO ETL
+# ────────────────────────────────
+def stage_echo(dataset: str, skip_download=False, stream=False, incremental=True) -> Staged:
+    """Download + unzip one ECHO dump; every CSV becomes its own table."""
+    if dataset not in ECHO_DATASETS:
+        raise ValueError(f"Choose from {list(ECHO_DATASETS)}")
+
+    url       = ECHO_DATASETS[dataset]
+    data_dir  = RAW_DATA_DIR / dataset
+    zip_path  = data_dir / f"{dataset}.zip"
+    extract   = data_dir / "extracted"
+
+    log.info(f"[{dataset}] ETL start")
+    timings = Timings(dataset)
+
+    prev, meta = (None, None) if skip_download else _incremental(ECHO_DB_PATH, dataset, url, incremental)
+    if prev and manifest.source_unchanged(prev, meta):
+        log.info(f"[{dataset}] source unchanged since last load — skipping")
+        return Staged(dataset, [], meta)
+
+    if not skip_download:
+        _timed_download(timings, url, zip_path)
+    elif not zip_path.exists():
+        raise FileNotFoundError(zip_path)
+
+    members = [m for m in list_zip_members(zip_path) if m.path.suffix.lower() == ".csv"]
+    hashes = {snake(m.path.stem): manifest.member_hashes([m]) for m in members}
+
+    if stream:
+        log.info(f"📋 Found {len(members)} CSV members")
+        tables = [(snake(m.path.stem), [m]) for m in members]
+        return Staged(dataset, _skip_unchanged(dataset, prev, tables, hashes), meta, hashes, timings)
+
+    if extract.exists(): shutil.rmtree(extract)
+    _timed_unzip(timings, zip_path, extract)
+
+    csvs = list(extract.rglob("*.csv")) + list(extract.rglob("*.CSV"))
+    log.info(f"📋 Found {len(csvs)} CSV files")
+    tables = [(snake(csv.stem), [csv]) for csv in csvs]
+    return Staged(dataset, _skip_unchanged(dataset, prev, tables, hashes), meta, hashes, timings)
+
+def run_echo_etl(dataset: str, skip_download=False, stream=False, incremental=True, typed=False,
+                 cluster=True, changes=True, parquet=True,
+                 memory_limit: str | None = INGEST_MEMORY_LIMIT, index=True):
+    with disk_watermark(dataset):
+        staged = stage_echo(dataset, skip_download, stream, incremental)
+        if staged.tables:
+            with snapshots.build(ECHO_DB_PATH) as db:
+                ingest(db, staged, typed=typed, cluster=cluster, changes=changes, memory_limit=memory_limit,
+                       index=index)
+            if parquet:
+                export.export_tables(ECHO_DB_PATH, [t for t, _ in staged.tables])
+    log.info(f"✅  ETL done – {len(staged.tables)} tables, DB → {ECHO_DB_PATH.resolve()}")
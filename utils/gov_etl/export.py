@@ -0,0 +1,117 @@
+"""Hive-partitioned Parquet copy of each published table.
+
+Readers that only need a slice — one state's handlers, one year of manifests
+— can scan ``PARQUET_ROOT/<db>/<table>/**/*.parquet`` with
+``hive_partitioning=true`` instead of opening the DuckDB file, and any number
+of processes can do so at once.  Each table is written to a fresh versioned
+directory under ``PARQUET_ROOT/_versions`` and ``PARQUET_ROOT/<db>/<table>``
+is then swapped to it with an atomic symlink replace, like ``snapshots``.
+Rows are sorted by ``layout.CLUSTER_KEYS`` inside each file, so the per
+row-group min/max statistics Parquet keeps stay narrow.
+
+    SELECT count(*)
+    FROM read_parquet('~/db/parquet/rcrainfo/HD_HANDLER/**/*.parquet', hive_partitioning=true)
+    WHERE location_state = 'TX'
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+import duckdb
+
+from . import layout, schemas
+from .settings import PARQUET_KEEP, PARQUET_ROOT, PARQUET_ROW_GROUP_ROWS, log
+
+# partition column -> (source column, its schemas type, optional SQL function);
+# the cast only applies while the source is still VARCHAR (untyped mode)
+PARTITIONS: dict[str, dict[str, tuple]] = {
+    "HD_HANDLER":  {"location_state": ("location_state", schemas.CODE, None)},
+    "EM_MANIFEST": {"shipped_year":   ("shipped_date", schemas.DATE(*schemas.ANY_DATE), "year")},
+}
+
+_BY_NAME = {k.lower(): v for k, v in PARTITIONS.items()}
+
+
+def partitions(table: str) -> dict[str, tuple] | None:
+    return _BY_NAME.get(table.lower())
+
+
+def _partition_sql(types: dict[str, str], col: str, spec: tuple, fn: str | None) -> str:
+    expr = schemas.cast_sql(col, spec) if types[col] == "VARCHAR" else f'"{col}"'
+    return f"{fn}({expr})" if fn else expr
+
+
+def _swap(link: Path, target: Path):
+    link.parent.mkdir(parents=True, exist_ok=True)
+    tmp = link.with_name(f".{link.name}.swap")
+    tmp.unlink(missing_ok=True)
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+def _prune(versions: Path, live: Path, keep: int):
+    cur = live.resolve() if live.is_symlink() else None
+    for old in sorted(p for p in versions.iterdir() if p.is_dir())[:-keep] if keep else []:
+        if old != cur:
+            shutil.rmtree(old)
+
+
+def row_group_stats(con, path: Path) -> dict:
+    """Files, row groups, rows and compressed bytes under ``path``."""
+    files, groups, rows, nbytes = con.execute("""
+        SELECT count(DISTINCT file_name), count(DISTINCT (file_name, row_group_id)),
+               sum(row_group_num_rows) FILTER (WHERE column_id = 0),
+               sum(total_compressed_size)
+        FROM parquet_metadata(?)
+    """, [f"{path}/**/*.parquet"]).fetchone()
+    return {"files": files, "row_groups": groups, "rows": rows or 0, "bytes": nbytes or 0}
+
+
+def export_table(con, table: str, db_stem: str, version: str,
+                 keep: int = PARQUET_KEEP, row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> dict:
+    """Write ``table`` as Parquet and point ``PARQUET_ROOT/<db_stem>/<table>`` at it."""
+    t0 = time.perf_counter()
+    versions = PARQUET_ROOT / "_versions" / db_stem / table
+    out = versions / version
+    if out.exists():
+        shutil.rmtree(out)
+    versions.mkdir(parents=True, exist_ok=True)
+
+    types = {r[0]: r[1] for r in con.execute(f'DESCRIBE "{table}"').fetchall()}
+    parts = {p: _partition_sql(types, *src) for p, src in (partitions(table) or {}).items() if src[0] in types}
+    replace = [f'{expr} AS "{p}"' for p, expr in parts.items() if p in types]
+    extra = [f'{expr} AS "{p}"' for p, expr in parts.items() if p not in types]
+    star = f"* REPLACE ({', '.join(replace)})" if replace else "*"
+    select = f'SELECT {", ".join([star] + extra)} FROM "{table}"{layout.order_by_sql(layout.cluster_keys(table))}'
+
+    opts = ["FORMAT parquet", "COMPRESSION zstd", f"ROW_GROUP_SIZE {int(row_group_rows)}"]
+    if parts:
+        opts.append(f"PARTITION_BY ({', '.join(chr(34) + p + chr(34) for p in parts)})")
+        target = out
+    else:
+        out.mkdir()
+        target = out / "data_0.parquet"
+    con.execute(f"COPY ({select}) TO '{target}' ({', '.join(opts)})")
+
+    live = PARQUET_ROOT / db_stem / table
+    _swap(live, out)
+    _prune(versions, live, keep)
+    stats = row_group_stats(con, out)
+    log.info(f"📦 [{table}] {stats['rows']:,} rows → {stats['files']} files / {stats['row_groups']} row groups, "
+             f"{stats['bytes'] / 2**20:,.1f} MB"
+             f"{' by ' + ', '.join(parts) if parts else ''} ({time.perf_counter() - t0:,.1f}s)")
+    return stats
+
+
+def export_tables(db_path: Path, tables: list[str]) -> dict[str, dict]:
+    """Export ``tables`` from the published ``db_path``, versioned by its snapshot name."""
+    src = db_path.resolve()
+    out = {}
+    with duckdb.connect(src, read_only=True) as con:
+        present = {r[0] for r in con.execute("SELECT table_name FROM duckdb_tables() WHERE schema_name = 'main'").fetchall()}
+        for table in dict.fromkeys(tables):
+            if table in present:
+                out[table] = export_table(con, table, db_path.stem, src.stem)
+    return out
@@ -0,0 +1,95 @@
+"""Resumable HTTP download with retry/backoff.
+
+Bytes go to ``<name>.part`` and are resumed with a Range request after a
+dropped connection (or a crashed run).  The ETag/Last-Modified seen when the
+part was started is kept in ``<name>.part.meta`` and sent as ``If-Range``, so
+a file republished in the meantime restarts from zero instead of being
+spliced onto stale bytes.  The finished file must match the server's length
+before it is renamed into place.
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+import requests
+from tqdm.auto import tqdm
+
+from .settings import DOWNLOAD_CHUNK, DOWNLOAD_RETRIES, log
+
+RETRYABLE = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class IncompleteDownload(IOError):
+    pass
+
+
+def _total(r: requests.Response, have: int) -> int | None:
+    """Full file size from Content-Range (206) or Content-Length (200)."""
+    m = re.match(r"bytes \d+-\d+/(\d+)", r.headers.get("Content-Range", ""))
+    if m:
+        return int(m.group(1))
+    if r.headers.get("Content-Length"):
+        return int(r.headers["Content-Length"]) + (have if r.status_code == 206 else 0)
+    return None
+
+
+def download(url: str, to: Path, chunk: int = DOWNLOAD_CHUNK, retries: int = DOWNLOAD_RETRIES,
+             backoff: float = 2.0, timeout: float = 60) -> Path:
+    to.parent.mkdir(parents=True, exist_ok=True)
+    part = to.with_name(to.name + ".part")
+    meta = to.with_name(to.name + ".part.meta")
+
+    validator = None
+    if part.exists() and meta.exists():
+        saved = json.loads(meta.read_text())
+        validator = saved.get("validator") if saved.get("url") == url else None
+    if part.exists() and validator is None:
+        part.unlink()  # can't prove the partial bytes belong to this file
+
+    for attempt in range(retries + 1):
+        have = part.stat().st_size if part.exists() else 0
+        headers = {}
+        if have:
+            headers["Range"] = f"bytes={have}-"
+            headers["If-Range"] = validator
+        try:
+            with requests.get(url, stream=True, headers=headers, timeout=timeout) as r:
+                if r.status_code == 416:  # nothing left past `have`: stale or oversized part
+                    part.unlink(missing_ok=True)
+                    raise IncompleteDownload(f"range {have}- not satisfiable")
+                if r.status_code >= 500:
+                    raise IncompleteDownload(f"HTTP {r.status_code}")
+                r.raise_for_status()
+
+                if r.status_code != 206:  # full body: server ignored Range or file changed
+                    have = 0
+                validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+                meta.write_text(json.dumps({"url": url, "validator": validator}))
+                total = _total(r, have)
+
+                with tqdm(total=total, initial=have, unit="B", unit_scale=True, desc=to.name) as bar, \
+                        open(part, "ab" if have else "wb") as f:
+                    for blk in r.iter_content(chunk):
+                        if blk:
+                            f.write(blk); bar.update(len(blk))
+
+            size = part.stat().st_size
+            if total is not None and size != total:
+                raise IncompleteDownload(f"got {size:,} of {total:,} bytes")
+        except (*RETRYABLE, IncompleteDownload) as e:
+            if attempt == retries:
+                raise
+            wait = backoff * 2 ** attempt
+            log.warning(f"{to.name}: {e} — retry {attempt + 1}/{retries} in {wait:.0f}s")
+            time.sleep(wait)
+            continue
+
+        part.replace(to)
+        meta.unlink(missing_ok=True)
+        return to
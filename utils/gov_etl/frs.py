@@ -0,0 +1,109 @@
+"""Keyed FRS tables built from the national_combined dump.
+
+``stage_echo("frs")`` still lands every CSV as its own ``national_*`` table;
+``build`` then derives two tables from them that cross-program lookups can
+use without scanning the raw files:
+
+``frs_facility``
+    One row per ``registry_id`` with trimmed names/addresses, a
+    ``name_key`` (upper-case, letters and digits only, so ``T-Mobile``,
+    ``T MOBILE`` and ``TMOBILE`` all match ``'TMOBILE'``), a 5-digit ZIP and
+    numeric coordinates.
+
+``frs_program_xwalk``
+    ``registry_id ↔ (program, pgm_sys_id)`` for the programs in
+    ``PROGRAMS``; ``pgm_sys_id`` is the RCRA ``handler_id``, the NPDES
+    ``npdes_id`` or the ICIS-AIR ``pgm_sys_id`` respectively.
+
+Both are written sorted by their IDs and indexed on them through
+``indexes.INDEX_KEYS``.  The
+``frs_crosswalk`` view pivots the crosswalk to one row per facility.
+"""
+
+from . import indexes
+from .settings import log
+
+# FRS pgm_sys_acrnm -> program name used in frs_program_xwalk
+PROGRAMS = {
+    "RCRAINFO": "rcra",
+    "NPDES":    "npdes",
+    "AIR":      "icis_air",
+}
+
+FACILITY_COLUMNS = {
+    # frs_facility column: (national_facility_file column, SQL over it)
+    "primary_name":     ("primary_name",     "NULLIF(trim({c}), '')"),
+    "location_address": ("location_address", "NULLIF(trim({c}), '')"),
+    "city_name":        ("city_name",        "NULLIF(upper(trim({c})), '')"),
+    "county_name":      ("county_name",      "NULLIF(upper(trim({c})), '')"),
+    "state_code":       ("state_code",       "NULLIF(upper(trim({c})), '')"),
+    "postal_code":      ("postal_code",      "NULLIF(left(regexp_replace({c}, '[^0-9]', '', 'g'), 5), '')"),
+    "epa_region_code":  ("epa_region_code",  "NULLIF(trim({c}), '')"),
+    "latitude83":       ("latitude83",       "TRY_CAST({c} AS DOUBLE)"),
+    "longitude83":      ("longitude83",      "TRY_CAST({c} AS DOUBLE)"),
+}
+
+FACILITY_TABLE = "frs_facility"
+XWALK_TABLE    = "frs_program_xwalk"
+
+
+def _columns(con, table: str) -> set[str]:
+    return {r[0] for r in con.execute(
+        "SELECT column_name FROM duckdb_columns() WHERE table_name = ? AND schema_name = 'main'", [table]
+    ).fetchall()}
+
+
+def build(con, tables: list[str] | None = None) -> dict[str, int]:
+    """(Re)build ``frs_facility`` and ``frs_program_xwalk``; returns row counts.
+
+    ``tables`` (the reloaded ``national_*`` tables) is accepted for
+    ``POST_INGEST``; both tables are always rebuilt in full.
+    """
+    fac_cols, pgm_cols = _columns(con, "national_facility_file"), _columns(con, "national_program_file")
+    if "registry_id" not in fac_cols or not {"registry_id", "pgm_sys_acrnm", "pgm_sys_id"} <= pgm_cols:
+        log.warning("🏭 FRS facility/program files missing or unrecognised — skipping frs_* tables")
+        return {}
+
+    select = ",\n               ".join(
+        sql.format(c=f'"{src}"::VARCHAR' if src in fac_cols else "NULL::VARCHAR") + f' AS "{col}"'
+        for col, (src, sql) in FACILITY_COLUMNS.items()
+    )
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {FACILITY_TABLE} AS
+        SELECT trim(registry_id::VARCHAR) AS registry_id,
+               {select},
+               regexp_replace(upper(primary_name::VARCHAR), '[^A-Z0-9]', '', 'g') AS name_key
+        FROM national_facility_file
+        WHERE NULLIF(trim(registry_id::VARCHAR), '') IS NOT NULL
+        QUALIFY row_number() OVER (PARTITION BY trim(registry_id::VARCHAR)) = 1
+        ORDER BY registry_id
+    """)
+
+    programs = ", ".join(f"('{a}', '{p}')" for a, p in PROGRAMS.items())
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {XWALK_TABLE} AS
+        SELECT DISTINCT trim(p.registry_id::VARCHAR) AS registry_id,
+               m.program,
+               upper(trim(p.pgm_sys_acrnm::VARCHAR)) AS pgm_sys_acrnm,
+               trim(p.pgm_sys_id::VARCHAR)           AS pgm_sys_id
+        FROM national_program_file p
+        JOIN (VALUES {programs}) m(acrnm, program) ON upper(trim(p.pgm_sys_acrnm::VARCHAR)) = m.acrnm
+        WHERE NULLIF(trim(p.pgm_sys_id::VARCHAR), '') IS NOT NULL
+          AND NULLIF(trim(p.registry_id::VARCHAR), '') IS NOT NULL
+        ORDER BY program, pgm_sys_id
+    """)
+    for table in (FACILITY_TABLE, XWALK_TABLE):
+        indexes.finalize(con, table)
+
+    con.execute(f"""
+        CREATE OR REPLACE VIEW frs_crosswalk AS
+        SELECT registry_id,
+               list(pgm_sys_id ORDER BY pgm_sys_id) FILTER (WHERE program = 'rcra')     AS rcra_handler_ids,
+               list(pgm_sys_id ORDER BY pgm_sys_id) FILTER (WHERE program = 'npdes')    AS npdes_ids,
+               list(pgm_sys_id ORDER BY pgm_sys_id) FILTER (WHERE program = 'icis_air') AS icis_air_ids
+        FROM {XWALK_TABLE}
+        GROUP BY registry_id
+    """)
+    counts = {t: con.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in (FACILITY_TABLE, XWALK_TABLE)}
+    log.info(f"🏭 FRS: {counts[FACILITY_TABLE]:,} facilities, {counts[XWALK_TABLE]:,} program links")
+    return counts
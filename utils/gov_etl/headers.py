@@ -0,0 +1,127 @@
+"""Reconcile the CSV headers of every file that feeds one table.
+
+RCRAInfo splits big tables over many files, and now and then one of them
+ships a drifted header — an extra column, a dropped one, ``Handler ID`` vs
+``HANDLER_ID``.  Rather than trusting the first file, the loaders read the
+header line of every file (one cheap read each, no sniffing) and ``unify``
+them by ``snake`` name: the table gets the union of columns in first-seen
+order, each file is read with its own header renamed to snake case, and
+columns it lacks are filled with NULL.  ``record`` appends the result to
+``schema_history`` so drift is visible per snapshot::
+
+    SELECT * FROM schema_history WHERE change IS NOT NULL OR files_with < files_total
+"""
+
+import csv
+import io
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from .settings import log
+
+HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS schema_history (
+    snapshot      VARCHAR,
+    loaded_at     TIMESTAMP,
+    table_name    VARCHAR,
+    position      INTEGER,
+    column_name   VARCHAR,
+    source_names  VARCHAR[],      -- raw header spellings seen for this column
+    files_with    INTEGER,
+    files_total   INTEGER,
+    change        VARCHAR         -- added | dropped vs the previous load, else NULL
+)
+"""
+
+
+def snake(name: str) -> str:
+    name = name.lower()
+    name = re.sub(r'[^a-z0-9]+', '_', name).strip('_')
+    return re.sub(r'_+', '_', name)
+
+
+def snake_header(header: list[str]) -> list[str]:
+    """``snake`` each name; repeats within one header become ``name_2``, ``name_3``…"""
+    out, seen = [], {}
+    for h in header:
+        s = snake(h) or "column"
+        seen[s] = seen.get(s, 0) + 1
+        out.append(s if seen[s] == 1 else f"{s}_{seen[s]}")
+    return out
+
+
+def read_header(f, delim: str = ",", quote: str = '"') -> list[str]:
+    """First CSV record of a binary file object."""
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return next(csv.reader(text, delimiter=delim, quotechar=quote or '"'), [])
+    finally:
+        text.detach()
+
+
+def read_file_header(path: Path, delim: str = ",", quote: str = '"') -> list[str]:
+    with open(path, "rb") as f:
+        return read_header(f, delim, quote)
+
+
+class Unified(NamedTuple):
+    columns: list[str]                        # table columns, first-seen order
+    names: list[list[str]]                    # per file: its columns, snake-cased
+    sources: dict[str, list[str]]             # column -> raw spellings
+    files_with: dict[str, int]                # column -> files that have it
+
+    def select(self, i: int) -> str:
+        """Projection of file ``i`` (read with ``names[i]``) onto ``columns``."""
+        have = set(self.names[i])
+        return ", ".join(f'"{c}"' if c in have else f'NULL::VARCHAR AS "{c}"' for c in self.columns)
+
+    def groups(self) -> list[list[int]]:
+        """File indexes grouped by identical header, in first-seen order."""
+        by: dict[tuple, list[int]] = {}
+        for i, n in enumerate(self.names):
+            by.setdefault(tuple(n), []).append(i)
+        return list(by.values())
+
+
+def unify(headers: list[list[str]]) -> Unified:
+    columns: list[str] = []
+    sources: dict[str, list[str]] = {}
+    files_with: dict[str, int] = {}
+    names = []
+    for header in headers:
+        snaked = snake_header(header)
+        names.append(snaked)
+        for raw, s in zip(header, snaked):
+            if s not in sources:
+                columns.append(s)
+                sources[s] = []
+            if raw not in sources[s]:
+                sources[s].append(raw)
+            files_with[s] = files_with.get(s, 0) + 1
+    return Unified(columns, names, sources, files_with)
+
+
+def record(con, table: str, u: Unified) -> list[str]:
+    """Append ``table``'s reconciled header to ``schema_history``; returns drift messages."""
+    con.execute(HISTORY_DDL)
+    snapshot = con.execute("SELECT current_database()").fetchone()[0]
+    prev = [r[0] for r in con.execute("""
+        SELECT column_name FROM schema_history
+        WHERE table_name = ? AND change IS DISTINCT FROM 'dropped'
+          AND loaded_at = (SELECT max(loaded_at) FROM schema_history WHERE table_name = ?)
+    """, [table, table]).fetchall()]
+    now, total = datetime.now(), len(u.names)
+    rows = [(snapshot, now, table, i, c, u.sources[c], u.files_with[c], total,
+             "added" if prev and c not in prev else None)
+            for i, c in enumerate(u.columns)]
+    rows += [(snapshot, now, table, None, c, [], 0, total, "dropped") for c in prev if c not in u.columns]
+    con.executemany("INSERT INTO schema_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    drift = [f"{c} in {u.files_with[c]}/{total} files" for c in u.columns if u.files_with[c] < total]
+    drift += [f"{c} spelled {u.sources[c]}" for c in u.columns if len(u.sources[c]) > 1]
+    drift += [f"+{r[4]}" for r in rows if r[8] == "added"] + [f"-{r[4]}" for r in rows if r[8] == "dropped"]
+    if drift:
+        log.warning(f"🧬 [{table}] header drift: {'; '.join(drift)}")
+    return drift
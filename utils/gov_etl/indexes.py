@@ -0,0 +1,104 @@
+"""Post-load ART indexes, statistics, and a check that lookups use them.
+
+Sorting (``layout``) lets zone maps skip row groups, but a point lookup like
+``HD_HANDLER WHERE handler_id = 'TXR000087000'`` still reads every row group
+whose min/max straddles the value.  After each table loads, ``finalize``
+creates one ART index per column in ``INDEX_KEYS``, runs ``ANALYZE``, and
+then ``EXPLAIN ANALYZE``s an equality probe on a real key value to confirm the
+plan is an index scan.  A probe that still plans a sequential scan is logged
+as a warning rather than failing the load.
+
+DuckDB only uses single-column ART indexes, and only for predicates that
+match at most ``index_scan_max_count`` rows, so keys here are the
+high-cardinality ids analyses filter on, one index each.
+"""
+
+from .settings import log
+from .timing import Timings
+
+INDEX_KEYS: dict[str, tuple[str, ...]] = {
+    # ── RCRAInfo ──────────────────────────────────────────────
+    "HD_HANDLER":          ("handler_id",),
+    "HD_CERTIFICATION":    ("handler_id",),
+    "HD_REPORTING":        ("handler_id",),
+    "HD_OWNER_OPERATOR":   ("handler_id",),
+    "HD_NAICS":            ("handler_id",),
+    "EM_MANIFEST":         ("generator_id", "manifest_tracking_number"),
+    "handler_domain":      ("domain", "handler_id"),
+    # ── ICIS-AIR ──────────────────────────────────────────────
+    "icis_air_facilities":        ("pgm_sys_id", "registry_id"),
+    "icis_air_programs":          ("pgm_sys_id",),
+    "icis_air_fces_pces":         ("pgm_sys_id",),
+    "icis_air_violation_history": ("pgm_sys_id",),
+    "icis_air_formal_actions":    ("pgm_sys_id",),
+    "icis_air_informal_actions":  ("pgm_sys_id",),
+    # ── NPDES ─────────────────────────────────────────────────
+    "water_icis_facilities":      ("npdes_id",),
+    "water_icis_permits":         ("external_permit_nmbr",),
+    "water_npdes_inspections":    ("npdes_id",),
+    # ── FRS ───────────────────────────────────────────────────
+    "national_facility_file":     ("registry_id",),
+    "national_program_file":      ("registry_id", "pgm_sys_id"),
+    "frs_facility":               ("registry_id",),
+    "frs_program_xwalk":          ("pgm_sys_id", "registry_id"),
+    "echo_domain":                ("domain",),
+}
+
+_BY_NAME = {k.lower(): v for k, v in INDEX_KEYS.items()}
+
+
+def index_keys(table: str) -> tuple[str, ...] | None:
+    return _BY_NAME.get(table.lower())
+
+
+def index_name(table: str, col: str) -> str:
+    return f"{table}_{col}_idx"
+
+
+def drop_indexes(con, table: str):
+    """Drop every index on ``table`` (a table with indexes can't be renamed)."""
+    for (name,) in con.execute(
+        "SELECT index_name FROM duckdb_indexes() WHERE table_name = ? AND schema_name = 'main'", [table]
+    ).fetchall():
+        con.execute(f'DROP INDEX "{name}"')
+
+
+def uses_index(con, table: str, col: str) -> bool | None:
+    """Whether ``col = <some existing value>`` runs as an index scan.
+
+    None when there is nothing to probe: the column is empty, or the sampled
+    value matches more rows than DuckDB will ever fetch through an index.
+    """
+    row = con.execute(f'SELECT "{col}" FROM "{table}" WHERE "{col}" IS NOT NULL LIMIT 1').fetchone()
+    if row is None:
+        return None
+    value = str(row[0]).replace("'", "''")
+    limit = con.execute("SELECT current_setting('index_scan_max_count')").fetchone()[0]
+    if con.execute(f"""SELECT count(*) FROM "{table}" WHERE "{col}" = '{value}'""").fetchone()[0] > limit:
+        return None
+    plan = con.execute(f"""EXPLAIN ANALYZE SELECT * FROM "{table}" WHERE "{col}" = '{value}'""").fetchall()
+    return any("Index Scan" in line for _, text in plan for line in text.splitlines())
+
+
+def finalize(con, table: str, keys: tuple[str, ...] | None = None, timings: Timings | None = None) -> dict:
+    """Index ``keys`` (default ``INDEX_KEYS``), ANALYZE, verify; returns ``{col: uses_index}``."""
+    timings = timings or Timings(table)
+    keys = keys if keys is not None else index_keys(table) or ()
+    cols = {r[0] for r in con.execute(f'DESCRIBE "{table}"').fetchall()}
+    keys = [k for k in keys if k in cols]
+    with timings.stage("index", table):
+        for col in keys:
+            con.execute(f'DROP INDEX IF EXISTS "{index_name(table, col)}"')
+            con.execute(f'CREATE INDEX "{index_name(table, col)}" ON "{table}" ("{col}")')
+    with timings.stage("analyze", table):
+        con.execute(f'ANALYZE "{table}"')
+    verified = {}
+    with timings.stage("verify", table):
+        for col in keys:
+            verified[col] = uses_index(con, table, col)
+    bad = [c for c, ok in verified.items() if ok is False]
+    if bad:
+        log.warning(f"🔎 [{table}] point lookups on {', '.join(bad)} still plan a sequential scan")
+    elif keys:
+        log.info(f"🔎 [{table}] indexed + analyzed: {', '.join(keys)}")
+    return verified
@@ -0,0 +1,103 @@
+"""Physical row order for hot join/filter keys, and how well it prunes.
+
+DuckDB keeps min/max zone maps per row group.  Rows landing in CSV file
+order give every row group the full key range, so a ``handler_id = ?`` probe
+reads them all; writing the table sorted by its hot keys makes each row
+group cover a narrow slice that the zone maps can skip.
+"""
+
+from .settings import log
+
+HD_KEY = ("handler_id",)
+
+CLUSTER_KEYS: dict[str, tuple[str, ...]] = {
+    # ── RCRAInfo ──────────────────────────────────────────────
+    "HD_HANDLER":          ("current_record", "handler_id"),
+    "HD_CERTIFICATION":    HD_KEY,
+    "HD_REPORTING":        HD_KEY,
+    "HD_OWNER_OPERATOR":   HD_KEY,
+    "HD_HADDL_CONTACT":    HD_KEY,
+    "HD_NAICS":            HD_KEY,
+    "EM_MANIFEST":         ("generator_id", "shipped_date"),
+    # ── ICIS-AIR ──────────────────────────────────────────────
+    "icis_air_facilities":        ("pgm_sys_id",),
+    "icis_air_programs":          ("pgm_sys_id",),
+    # event tables lead with their derived date (see derived.py) so analysis
+    # date windows prune; ART indexes still serve the id lookups
+    "icis_air_fces_pces":         ("actual_end_date_dt", "pgm_sys_id"),
+    "icis_air_violation_history": ("earliest_frv_determ_date_dt", "pgm_sys_id"),
+    "icis_air_formal_actions":    ("settlement_entered_date_dt", "pgm_sys_id"),
+    "icis_air_informal_actions":  ("achieved_date_dt", "pgm_sys_id"),
+    # ── NPDES ─────────────────────────────────────────────────
+    "water_icis_facilities":      ("npdes_id",),
+    "water_icis_permits":         ("external_permit_nmbr",),
+    "water_npdes_inspections":    ("actual_begin_date_dt", "npdes_id"),
+    "water_npdes_ps_violations":  ("rnc_detection_date_dt", "npdes_id"),
+    "water_npdes_cs_violations":  ("rnc_detection_date_dt", "npdes_id"),
+    "water_npdes_se_violations":  ("rnc_detection_date_dt", "npdes_id"),
+    "water_npdes_formal_enforcement_actions": ("settlement_entered_date_dt", "npdes_id"),
+    # ── FRS ───────────────────────────────────────────────────
+    "national_facility_file":     ("registry_id",),
+    "national_program_file":      ("registry_id",),
+    "national_contact_file":      ("registry_id",),
+    "national_organization_file": ("registry_id",),
+}
+
+_BY_NAME = {k.lower(): v for k, v in CLUSTER_KEYS.items()}
+
+
+def cluster_keys(table: str) -> tuple[str, ...] | None:
+    return _BY_NAME.get(table.lower())
+
+
+def order_by_sql(keys: tuple[str, ...] | None) -> str:
+    return f" ORDER BY {', '.join(f'{chr(34)}{k}{chr(34)}' for k in keys)}" if keys else ""
+
+
+def sort_table(con, table: str, keys: tuple[str, ...]):
+    con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT * FROM "{table}"{order_by_sql(keys)}')
+
+
+def zone_map_report(con, table: str, keys: tuple[str, ...] | None = None, probes: int = 200) -> dict:
+    """Share of row groups an equality probe on each key must read.
+
+    Samples ``probes`` key values and checks them against each row group's
+    min/max from ``pragma_storage_info``.  1.0 means no pruning at all.
+    Keys that aren't columns of ``table`` are skipped.
+    """
+    cols = {r[0] for r in con.execute(f'DESCRIBE "{table}"').fetchall()}
+    keys = [k for k in keys or cluster_keys(table) or () if k in cols]
+    out = {}
+    for k in keys:
+        row = con.execute(f"""
+            WITH rg AS (
+                SELECT row_group_id,
+                       min(nullif(regexp_extract(stats, 'Min: ([^,\\]]*)', 1), '')) AS mn,
+                       max(nullif(regexp_extract(stats, 'Max: ([^,\\]]*)', 1), '')) AS mx
+                FROM pragma_storage_info('{table}')
+                WHERE column_name = '{k}'
+                GROUP BY row_group_id
+            ),
+            probe AS (
+                SELECT DISTINCT CAST("{k}" AS VARCHAR) AS v
+                FROM "{table}"
+                WHERE "{k}" IS NOT NULL
+                USING SAMPLE {probes} ROWS
+            )
+            SELECT avg(hits) / nullif((SELECT count(*) FROM rg), 0), (SELECT count(*) FROM rg)
+            FROM (
+                -- stats hold truncated string prefixes, so compare on prefixes
+                SELECT v, count(*) FILTER (
+                    WHERE mn IS NULL OR mx IS NULL
+                       OR (left(v, length(mn)) >= mn AND left(v, length(mx)) <= mx)
+                ) AS hits
+                FROM probe, rg GROUP BY v
+            )
+        """).fetchone()
+        out[k] = {"scan_fraction": row[0], "row_groups": row[1]}
+    if out:
+        log.info(f"🗺️  [{table}] zone maps: " + ", ".join(
+            f"{k} probe reads {v['scan_fraction']:.1%} of {v['row_groups']} row groups"
+            for k, v in out.items() if v["scan_fraction"] is not None
+        ))
+    return out
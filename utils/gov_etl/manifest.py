@@ -0,0 +1,114 @@
+"""``etl_manifest``: what was loaded into each DuckDB file, and from where.
+
+One row per CSV member, carrying the source URL, its ETag/Last-Modified and
+Content-Length, plus the member's byte size and CRC-32 from the zip
+directory.  A rerun compares a HEAD of the source against these rows to skip
+the download, and compares member hashes to skip rebuilding tables whose
+inputs are unchanged.
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import requests
+
+from .settings import log
+from .zipstream import ZipMember
+
+MANIFEST_DDL = """
+CREATE TABLE IF NOT EXISTS etl_manifest (
+    dataset         VARCHAR,
+    table_name      VARCHAR,
+    member          VARCHAR,
+    source_url      VARCHAR,
+    etag            VARCHAR,
+    last_modified   VARCHAR,
+    content_length  BIGINT,
+    member_size     BIGINT,
+    content_hash    VARCHAR,
+    loaded_at       TIMESTAMP
+)
+"""
+
+
+def remote_meta(url: str) -> dict:
+    """HEAD ``url``; empty values when the server won't say."""
+    meta = {"source_url": url, "etag": None, "last_modified": None, "content_length": None}
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=30)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        log.warning(f"HEAD {url} failed ({e}); assuming changed")
+        return meta
+    meta["etag"] = r.headers.get("ETag")
+    meta["last_modified"] = r.headers.get("Last-Modified")
+    if r.headers.get("Content-Length"):
+        meta["content_length"] = int(r.headers["Content-Length"])
+    return meta
+
+
+def member_hashes(members: list[ZipMember]) -> list[tuple[str, int, str]]:
+    return [(str(m.path), m.size, f"crc32:{m.crc:08x}") for m in members]
+
+
+def read_manifest(db_path: Path, dataset: str) -> dict[str, list[tuple]]:
+    """``{table: [(member, size, hash, etag, last_modified, content_length, url)]}``.
+
+    Only tables still present in the database are returned.
+    """
+    if not db_path.exists():
+        return {}
+    with duckdb.connect(db_path, read_only=True) as con:
+        if not con.execute("SELECT 1 FROM duckdb_tables() WHERE table_name = 'etl_manifest'").fetchone():
+            return {}
+        rows = con.execute("""
+            SELECT m.table_name, m.member, m.member_size, m.content_hash,
+                   m.etag, m.last_modified, m.content_length, m.source_url
+            FROM etl_manifest m
+            JOIN duckdb_tables() t ON t.table_name = m.table_name AND t.schema_name = 'main'
+            WHERE m.dataset = ?
+            ORDER BY m.table_name, m.member
+        """, [dataset]).fetchall()
+    out: dict[str, list[tuple]] = {}
+    for table, *rest in rows:
+        out.setdefault(table, []).append(tuple(rest))
+    return out
+
+
+def source_unchanged(prev: dict[str, list[tuple]], meta: dict) -> bool:
+    """True when the remote file matches what every loaded table came from."""
+    if not prev or meta["content_length"] is None:
+        return False
+    seen = {(r[3], r[4], r[5], r[6]) for rows in prev.values() for r in rows}
+    if len(seen) != 1:
+        return False
+    etag, last_modified, length, url = seen.pop()
+    if length != meta["content_length"]:
+        return False
+    if etag and meta["etag"]:
+        return etag == meta["etag"]
+    return url == meta["source_url"] and last_modified is not None and last_modified == meta["last_modified"]
+
+
+def table_unchanged(prev: dict[str, list[tuple]], table: str, hashes: list[tuple[str, int, str]]) -> bool:
+    return table in prev and sorted(r[:3] for r in prev[table]) == sorted(hashes)
+
+
+def record(con, dataset: str, meta: dict | None, hashes: dict[str, list[tuple[str, int, str]]]):
+    """Replace the manifest rows of ``dataset`` once all its tables are loaded."""
+    con.execute(MANIFEST_DDL)
+    con.execute("DELETE FROM etl_manifest WHERE dataset = ?", [dataset])
+    meta = meta or {}
+    now = datetime.now()
+    if not any(hashes.values()):
+        return
+    con.executemany(
+        "INSERT INTO etl_manifest VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (dataset, table, member, meta.get("source_url"), meta.get("etag"),
+             meta.get("last_modified"), meta.get("content_length"), size, digest, now)
+            for table, rows in hashes.items()
+            for member, size, digest in rows
+        ],
+    )
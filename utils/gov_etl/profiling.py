@@ -0,0 +1,112 @@
+"""One-pass column profiles for finding contact data in the loaded tables.
+
+``email_columns`` answers "which columns hold email addresses" for a whole
+database with one scan per table: every VARCHAR column of a table is tested
+in the same ``SELECT`` (a ``count(*) FILTER`` and a ``min_by(..., n)``
+sample per column) instead of a count query plus a sample query per column.
+Tables can be scanned on several cursors at once, and results are cached in
+``PROFILE_CACHE_DIR`` per snapshot file, so reopening the notebook on the
+same snapshot doesn't rescan anything.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import duckdb
+
+from .settings import PROFILE_CACHE_DIR, log
+from .snapshots import db_file, file_key
+
+EMAIL_PATTERN = "%@%"
+SAMPLES = 5
+
+
+def _sql_str(v) -> str:
+    return "'" + str(v).replace("'", "''") + "'"
+
+
+def varchar_columns(con) -> dict[str, list[str]]:
+    """``{table: [VARCHAR columns]}`` for the base tables of the current database."""
+    out: dict[str, list[str]] = {}
+    for table, col in con.execute("""
+        SELECT c.table_name, c.column_name
+        FROM duckdb_columns() c
+        JOIN duckdb_tables() t USING (database_name, schema_name, table_name)
+        WHERE c.database_name = current_database() AND c.schema_name = 'main' AND c.data_type = 'VARCHAR'
+        ORDER BY c.table_name, c.column_index
+    """).fetchall():
+        out.setdefault(table, []).append(col)
+    return out
+
+
+def profile_table(con, table: str, cols: list[str], pattern: str = EMAIL_PATTERN,
+                  samples: int = SAMPLES) -> list[dict]:
+    """Rows matching ``pattern`` and up to ``samples`` of them, for every column in one scan."""
+    aggs = []
+    for c in cols:
+        hit = f'"{c}" LIKE {_sql_str(pattern)}'
+        aggs += [f"count(*) FILTER (WHERE {hit})", f'min_by("{c}", 0, {int(samples)}) FILTER (WHERE {hit})']
+    row = con.execute(f'SELECT {", ".join(aggs)} FROM "{table}"').fetchone()
+    return [{"table": table, "column": c, "email_count": row[2 * i], "samples": row[2 * i + 1] or []}
+            for i, c in enumerate(cols)]
+
+
+def _read_cache(path: Path, key: list) -> list[dict] | None:
+    try:
+        cached = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return cached["columns"] if cached.get("key") == key else None
+
+
+def _write_cache(path: Path, key: list, columns: list[dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"key": key, "columns": columns}))
+    os.replace(tmp, path)
+
+
+def email_columns(con, db_name: str | None = None, workers: int = 1, cache=True,
+                  refresh=False) -> list[dict]:
+    """Email count and samples for every VARCHAR column of every table.
+
+    One dict per column — ``database``, ``table``, ``column``,
+    ``email_count``, ``samples`` — in table/column order.  ``workers`` > 1
+    scans that many tables at once.  A table whose scan fails is logged and
+    left out, and the result isn't cached, so the next call retries it.
+    """
+    db_name = db_name or con.execute("SELECT current_database()").fetchone()[0]
+    snap = db_file(con) if cache else None
+    path = key = None
+    if snap and snap.exists():
+        path = PROFILE_CACHE_DIR / f"{snap.name}.email_columns.json"
+        key = file_key(snap)
+        cached = None if refresh else _read_cache(path, key)
+        if cached is not None:
+            return cached
+
+    def scan(table: str, cols: list[str]) -> list[dict]:
+        cur = con.cursor()   # one cursor per thread; same database
+        try:
+            return profile_table(cur, table, cols)
+        finally:
+            cur.close()
+
+    tables = varchar_columns(con)
+    by_table, failed = {}, []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(scan, t, cols): t for t, cols in tables.items()}
+        for fut in as_completed(futures):
+            table = futures[fut]
+            try:
+                by_table[table] = fut.result()
+            except duckdb.Error as e:
+                failed.append(table)
+                log.warning(f"📇 [{db_name}] profiling {table} failed: {e}")
+
+    columns = [{"database": db_name, **r} for t in tables if t in by_table for r in by_table[t]]
+    if path and not failed:
+        _write_cache(path, key, columns)
+    return columns
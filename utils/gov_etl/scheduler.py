@@ -0,0 +1,105 @@
+"""Run several datasets at once: parallel fetch, one writer per DuckDB file."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from . import export, snapshots
+from .etl import disk_watermark, ingest, stage_echo, stage_rcra
+from .settings import ECHO_DB_PATH, INGEST_MEMORY_LIMIT, INGEST_THREADS, RCRA_DB_PATH, log
+
+
+def run_all(rcra=(), echo=(), workers: int = 4, skip_download=False,
+            stream=False, incremental=True, typed=False, cluster=True,
+            threads: int | None = INGEST_THREADS, changes=True, parquet=True,
+            memory_limit: str | None = INGEST_MEMORY_LIMIT, index=True) -> dict[str, Exception | None]:
+    """Refresh the given RCRA and ECHO datasets concurrently.
+
+    Download + unzip runs on a pool of ``workers`` threads.  Each DuckDB file
+    gets its own single-thread writer, so ingests into rcrainfo.duckdb and
+    echo.duckdb overlap with each other and with outstanding downloads, but
+    never with a second writer on the same file.  A failing dataset is logged
+    and reported in the returned ``{key: error}`` map; the rest still load.
+
+    Writes go to a new snapshot per DuckDB file (see ``snapshots``), which
+    is swapped in once all its ingests finish.  If any ingest into a file
+    failed, that file's snapshot is discarded and the live one stays put, and
+    every dataset that wrote to it is reported failed too.
+
+    ``stream=True`` ingests CSVs straight from the downloaded zips;
+    ``incremental`` skips sources and tables the etl_manifest says are current;
+    ``typed`` casts tables per ``schemas.TABLE_SCHEMAS`` at load time and
+    ``cluster`` sorts them per ``layout.CLUSTER_KEYS``.  ``threads`` caps the
+    DuckDB threads each CSV scan may use; ``changes`` records per-snapshot
+    deltas in ``etl_changes`` (see ``cdc``); ``parquet`` re-exports the
+    rebuilt tables of each published file to the Parquet tier (see ``export``).
+    ``memory_limit`` (e.g. ``"4GB"``) applies to each writer's DuckDB
+    connection; with two files refreshing at once, budget for both.
+    ``index`` builds the ``indexes.INDEX_KEYS`` ART indexes and statistics.
+    """
+    jobs = [(k, RCRA_DB_PATH, stage_rcra) for k in rcra] + [(d, ECHO_DB_PATH, stage_echo) for d in echo]
+    writers: dict[Path, ThreadPoolExecutor] = {
+        db: ThreadPoolExecutor(1, thread_name_prefix=f"write-{db.stem}") for _, db, _ in jobs
+    }
+    results: dict[str, Exception | None] = {}
+    pending = {}
+    builds: dict[Path, Path] = {}
+    loaded: dict[Path, list[str]] = {}          # tables rebuilt in each file's snapshot
+    writers_of: dict[Path, list[str]] = {}      # datasets that wrote to it
+    failed_dbs: set[Path] = set()
+    t0 = time.perf_counter()
+
+    def write(db: Path, staged, desc: str) -> int:
+        if not staged.tables:
+            return 0
+        if db not in builds:  # only ever touched from db's own writer thread
+            builds[db] = snapshots.begin(db)
+        loaded.setdefault(db, []).extend(t for t, _ in staged.tables)
+        writers_of.setdefault(db, []).append(staged.dataset)
+        return ingest(builds[db], staged, desc, typed, cluster, threads, changes, memory_limit, index)
+
+    with disk_watermark("run_all"):
+        try:
+            with ThreadPoolExecutor(max(1, workers), thread_name_prefix="fetch") as pool:
+                fetches = {pool.submit(stage, key, skip_download, stream, incremental): (key, db) for key, db, stage in jobs}
+                for fut in as_completed(fetches):
+                    key, db = fetches[fut]
+                    try:
+                        staged = fut.result()
+                    except Exception as e:
+                        log.error(f"[{key}] fetch failed: {e}")
+                        results[key] = e
+                        continue
+                    pending[writers[db].submit(write, db, staged, f"Ingest {key}")] = (key, db)
+
+            for fut in as_completed(pending):
+                key, db = pending[fut]
+                try:
+                    fut.result()
+                    results[key] = None
+                except Exception as e:
+                    log.error(f"[{key}] ingest failed: {e}")
+                    results[key] = e
+                    failed_dbs.add(db)
+        finally:
+            for w in writers.values():
+                w.shutdown(wait=True)
+
+        for db, snap in builds.items():
+            if db in failed_dbs:
+                log.error(f"❌ {db.name}: keeping current snapshot, discarding {snap.name}")
+                snapshots.discard(snap)
+                for key in writers_of.get(db, ()):   # loaded fine, but nothing of theirs was published
+                    if results.get(key) is None:
+                        results[key] = RuntimeError(f"discarded with {snap.name}")
+            else:
+                snapshots.publish(db, snap)
+                if parquet:
+                    try:
+                        export.export_tables(db, loaded[db])
+                    except Exception as e:  # the DuckDB snapshot is already live
+                        log.error(f"❌ {db.name}: Parquet export failed: {e}")
+
+    ok = sum(e is None for e in results.values())
+    log.info(f"✅  {ok}/{len(jobs)} datasets refreshed in {time.perf_counter() - t0:,.0f}s")
+    return results
@@ -0,0 +1,150 @@
+"""Per-table column types for the typed ingest mode.
+
+Tables still land as ALL_VARCHAR first; ``apply_schema`` then rewrites them
+once with the declared casts, so analysis queries stop re-parsing dates and
+amounts on every run.  Rows where a non-empty value fails its cast are moved
+to ``<table>_rejects`` (with a ``reject_columns`` list) instead of being
+silently nulled.  Columns not listed here stay VARCHAR.
+
+Note: downstream SQL that still calls ``strptime`` on a typed DATE column
+must drop the call — typed mode is opt-in for that reason.
+"""
+
+from .layout import order_by_sql
+from .settings import log
+
+
+def DATE(*fmts: str) -> tuple:
+    return ("DATE", fmts)
+
+DOUBLE  = ("DOUBLE", None)
+BIGINT  = ("BIGINT", None)
+FLAG    = ("BOOLEAN", None)   # Y/N, T/F, 1/0
+CODE    = ("CODE", None)      # trimmed + upper-cased VARCHAR, never rejected
+
+MDY_SLASH = "%m/%d/%Y"
+MDY_DASH  = "%m-%d-%Y"
+ANY_DATE  = ("%m/%d/%Y", "%Y-%m-%d", "%Y%m%d", "%m-%d-%Y", "%Y-%m-%dT%H:%M:%S")
+
+TABLE_SCHEMAS: dict[str, dict[str, tuple]] = {
+    # ── RCRAInfo ──────────────────────────────────────────────
+    "HD_HANDLER": {
+        "receive_date":        DATE("%Y%m%d"),
+        "current_record":      FLAG,
+        "fed_waste_generator": CODE,
+        "location_state":      CODE,
+    },
+    "EM_MANIFEST": {
+        "shipped_date":          DATE(*ANY_DATE),
+        "received_date":         DATE(*ANY_DATE),
+        "total_quantity_tons":   DOUBLE,
+        "total_quantity_kg":     DOUBLE,
+        "generator_location_state": CODE,
+    },
+    # ── ICIS-AIR ──────────────────────────────────────────────
+    "icis_air_fces_pces": {
+        "actual_end_date":     DATE(MDY_DASH, MDY_SLASH),
+    },
+    "icis_air_violation_history": {
+        "earliest_frv_determ_date": DATE(MDY_DASH, MDY_SLASH),
+        "hpv_dayzero_date":         DATE(MDY_DASH, MDY_SLASH),
+        "hpv_resolved_date":        DATE(MDY_DASH, MDY_SLASH),
+    },
+    "icis_air_formal_actions": {
+        "settlement_entered_date": DATE(MDY_SLASH, MDY_DASH),
+        "penalty_amount":          DOUBLE,
+    },
+    "icis_air_informal_actions": {
+        "achieved_date":       DATE(MDY_SLASH, MDY_DASH),
+    },
+    "icis_air_programs": {
+        "begin_date":          DATE(MDY_SLASH, MDY_DASH),
+        "updated_date":        DATE(MDY_SLASH, MDY_DASH),
+        "air_operating_status_code": CODE,
+    },
+    # ── NPDES ─────────────────────────────────────────────────
+    "water_npdes_inspections": {
+        "actual_begin_date":   DATE(MDY_SLASH),
+        "actual_end_date":     DATE(MDY_SLASH),
+    },
+    "water_npdes_ps_violations": {
+        "rnc_detection_date":  DATE(MDY_SLASH),
+        "rnc_resolution_date": DATE(MDY_SLASH),
+    },
+    "water_npdes_cs_violations": {
+        "rnc_detection_date":  DATE(MDY_SLASH),
+        "rnc_resolution_date": DATE(MDY_SLASH),
+    },
+    "water_npdes_se_violations": {
+        "rnc_detection_date":  DATE(MDY_SLASH),
+        "rnc_resolution_date": DATE(MDY_SLASH),
+    },
+    "water_npdes_formal_enforcement_actions": {
+        "settlement_entered_date":  DATE(MDY_SLASH),
+        "fed_penalty_assessed_amt": DOUBLE,
+        "state_local_penalty_amt":  DOUBLE,
+    },
+    "water_icis_permits": {
+        "effective_date":      DATE(MDY_SLASH),
+        "expiration_date":     DATE(MDY_SLASH),
+        "version_nmbr":        BIGINT,
+        "permit_status_code":  CODE,
+    },
+}
+
+_BY_NAME = {k.lower(): v for k, v in TABLE_SCHEMAS.items()}
+
+
+def schema_for(table: str) -> dict[str, tuple] | None:
+    return _BY_NAME.get(table.lower())
+
+
+def cast_sql(col: str, spec: tuple) -> str:
+    kind, fmts = spec
+    c = f'"{col}"'
+    if kind == "DATE":
+        fmt_list = ", ".join(f"'{f}'" for f in fmts)
+        return f"try_strptime(trim({c}), [{fmt_list}])::DATE"
+    if kind == "DOUBLE":
+        return f"TRY_CAST(replace(trim({c}), ',', '') AS DOUBLE)"
+    if kind == "BOOLEAN":
+        return (f"CASE WHEN upper(trim({c})) IN ('Y','YES','T','TRUE','1') THEN TRUE "
+                f"WHEN upper(trim({c})) IN ('N','NO','F','FALSE','0') THEN FALSE END")
+    if kind == "CODE":
+        return f"NULLIF(upper(trim({c})), '')"
+    return f"TRY_CAST(trim({c}) AS {kind})"
+
+
+def apply_schema(con, table: str, spec: dict[str, tuple] | None = None, order_by=None) -> int:
+    """Rewrite ``table`` with typed columns; returns the number of rejected rows.
+
+    ``order_by`` keys are applied in the same rewrite, after casting.
+    """
+    spec = spec or schema_for(table)
+    if not spec:
+        return 0
+    cols = [r[0] for r in con.execute(f'DESCRIBE "{table}"').fetchall()]
+    missing = [c for c in spec if c not in cols]
+    if missing:
+        log.warning(f"[{table}] schema columns not in table: {missing}")
+    typed = {c: s for c, s in spec.items() if c in cols}
+
+    fails = {c: f"(NULLIF(trim(\"{c}\"), '') IS NOT NULL AND {cast_sql(c, s)} IS NULL)"
+             for c, s in typed.items() if s[0] != "CODE"}
+    bad = " OR ".join(fails.values()) or "FALSE"
+    reject_cols = "list_filter([" + ", ".join(
+        f"CASE WHEN {cond} THEN '{c}' END" for c, cond in fails.items()
+    ) + "], x -> x IS NOT NULL)" if fails else "[]::VARCHAR[]"
+
+    n_bad = con.execute(f'SELECT COUNT(*) FROM "{table}" WHERE {bad}').fetchone()[0]
+    if n_bad:
+        con.execute(f'CREATE OR REPLACE TABLE "{table}_rejects" AS '
+                    f'SELECT *, {reject_cols} AS reject_columns FROM "{table}" WHERE {bad}')
+        log.warning(f"[{table}] {n_bad:,} rows failed typing → {table}_rejects")
+    else:
+        con.execute(f'DROP TABLE IF EXISTS "{table}_rejects"')
+
+    select = ", ".join(f'{cast_sql(c, typed[c])} AS "{c}"' if c in typed else f'"{c}"' for c in cols)
+    con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT {select} FROM "{table}" WHERE NOT ({bad})'
+                f'{order_by_sql(order_by)}')
+    return n_bad
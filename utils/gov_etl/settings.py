@@ -0,0 +1,60 @@
+"""Paths and dataset URLs shared by the gov_data ETL."""
+
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+# ────────────────────────────────
+# Basic settings
+# ────────────────────────────────
+DATA_ROOT      = Path("~/data").expanduser()
+DB_ROOT        = Path("~/db").expanduser()
+RAW_DATA_DIR   = DATA_ROOT / "gov_raw"
+RCRA_DB_PATH   = DB_ROOT / "rcrainfo.duckdb"
+ECHO_DB_PATH   = DB_ROOT / "echo.duckdb"
+SNAPSHOT_DIR   = DB_ROOT / "snapshots"     # dated builds; the paths above symlink into here
+SNAPSHOT_KEEP  = 3
+PARQUET_ROOT   = DB_ROOT / "parquet"       # <db>/<table>/ → hive-partitioned export (see export.py)
+PARQUET_KEEP   = 2
+PARQUET_ROW_GROUP_ROWS = 122_880
+
+RCRA_DATASETS = {
+    "hd":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Handler/HD.zip",
+    "ce":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Compliance,%20Monitoring%20and%20Enforcement/CE.zip",
+    "ca":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Corrective%20Action/CA.zip",
+    "br":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Biennial%20Report/BR.zip",
+    "em":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/eManifest/EM.zip",
+    "fa":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Financial%20Assurance/FA.zip",
+    "pm":       "https://s3.amazonaws.com/rcrainfo-ftp/Production/CSV-{date}/Permitting/PM.zip"
+}
+
+ECHO_DATASETS = {
+    "air":      "https://echo.epa.gov/files/echodownloads/ICIS-AIR_downloads.zip",
+    "water":    "https://echo.epa.gov/files/echodownloads/npdes_downloads.zip",
+    "rcra":     "https://echo.epa.gov/files/echodownloads/rcra_downloads.zip",
+    "rcra_viol":"https://echo.epa.gov/files/echodownloads/pipeline_rcra_downloads.zip",
+    "frs":      "https://ordsext.epa.gov/FLA/www3/state_files/national_combined.zip"
+}
+
+# RCRAInfo snapshot discovery (see discover.py)
+SNAPSHOT_STAMPS        = DATA_ROOT / "rcra_snapshot_stamps.json"
+SNAPSHOT_TIMES         = ("03-00-00-0400", "03-00-00-0500")   # EDT, EST
+SNAPSHOT_LOOKBACK_DAYS = 14
+STAMP_TTL              = timedelta(hours=6)
+
+DOWNLOAD_CHUNK   = 4 << 20   # bytes per read/write; multi-GB zips don't need 8 KiB syscalls
+DOWNLOAD_RETRIES = 5
+INGEST_THREADS   = None      # DuckDB threads for CSV scans; None = DuckDB default (all cores)
+
+# Memory-bounded ingest (EM / BR on a laptop): ingest(memory_limit="4GB")
+INGEST_MEMORY_LIMIT = None   # None = DuckDB default (80% of RAM)
+INGEST_TEMP_DIR     = DATA_ROOT / "duckdb_tmp"   # spill space for sorts/joins past the limit
+INGEST_CHUNK_FILES  = 4      # CSV files per INSERT when memory-bounded
+
+# Column profiles (see profiling.py), cached per snapshot file
+PROFILE_CACHE_DIR = DATA_ROOT / "column_profiles"
+
+# Facility-activity interval indexes (see activity.py), one parquet per snapshot file
+ACTIVITY_CACHE_DIR = DATA_ROOT / "activity_index"
+
+log = logging.getLogger("etl")
@@ -0,0 +1,111 @@
+"""Blue/green DuckDB snapshots behind a stable ``current`` path.
+
+``RCRA_DB_PATH`` / ``ECHO_DB_PATH`` become symlinks into
+``DB_ROOT/snapshots/<stem>-<stamp>.duckdb``.  A refresh copies the current
+snapshot to a new dated file, loads into that, and only then swaps the
+symlink with an atomic ``os.replace``.  Notebooks that open the live path
+read-only keep reading the old file until they reconnect; they never wait on
+the ETL's write lock and never see a half-built schema.  The last
+``SNAPSHOT_KEEP`` snapshots stay on disk for ``rollback``.
+"""
+
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from .settings import SNAPSHOT_DIR, SNAPSHOT_KEEP, log
+
+
+def current(live: Path) -> Path | None:
+    """File the live path points at (the live file itself before the first swap)."""
+    if live.is_symlink():
+        return live.resolve()
+    return live if live.exists() else None
+
+
+def history(live: Path) -> list[Path]:
+    """Snapshots of ``live``, oldest first."""
+    return sorted(SNAPSHOT_DIR.glob(f"{live.stem}-*.duckdb"))
+
+
+def begin(live: Path) -> Path:
+    """New dated snapshot file, seeded with a copy of the current one."""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = f"{datetime.now():%Y-%m-%dT%H%M%S}"
+    new, n = SNAPSHOT_DIR / f"{live.stem}-{stamp}.duckdb", 1
+    while new.exists():
+        new, n = SNAPSHOT_DIR / f"{live.stem}-{stamp}.{n}.duckdb", n + 1
+    src = current(live)
+    if src is not None:
+        log.info(f"📸 seeding {new.name} from {src.name}")
+        shutil.copyfile(src, new)
+        wal = src.with_name(src.name + ".wal")
+        if wal.exists():
+            shutil.copyfile(wal, new.with_name(new.name + ".wal"))
+    return new
+
+
+def publish(live: Path, snap: Path, keep: int = SNAPSHOT_KEEP):
+    """Atomically point ``live`` at ``snap`` and prune old snapshots."""
+    if live.exists() and not live.is_symlink():
+        # first swap: keep the pre-snapshot file around for rollback
+        legacy = SNAPSHOT_DIR / f"{live.stem}-0000-legacy.duckdb"
+        try:
+            os.link(live, legacy)
+        except OSError:
+            shutil.copyfile(live, legacy)
+    tmp = live.with_name(f".{live.name}.swap")
+    tmp.unlink(missing_ok=True)
+    os.symlink(snap, tmp)
+    os.replace(tmp, live)
+    log.info(f"🔀 {live.name} → {snap.name}")
+    prune(live, keep)
+
+
+def discard(snap: Path):
+    for p in (snap, snap.with_name(snap.name + ".wal")):
+        p.unlink(missing_ok=True)
+
+
+def prune(live: Path, keep: int = SNAPSHOT_KEEP):
+    cur = current(live)
+    for old in history(live)[:-keep] if keep else []:
+        if old != cur:
+            discard(old)
+            log.info(f"🧹 pruned {old.name}")
+
+
+def rollback(live: Path, steps: int = 1) -> Path:
+    """Point ``live`` back ``steps`` snapshots; returns the new target."""
+    snaps = history(live)
+    i = snaps.index(current(live)) - steps
+    if i < 0:
+        raise ValueError(f"only {len(snaps)} snapshots of {live.name} kept")
+    publish(live, snaps[i], keep=0)
+    return snaps[i]
+
+
+def db_file(con) -> Path | None:
+    """File behind ``con``'s current database; None for an in-memory one."""
+    row = con.execute("SELECT path FROM duckdb_databases() WHERE database_name = current_database()").fetchone()
+    return Path(row[0]) if row and row[0] else None
+
+
+def file_key(path: Path) -> list:
+    """Resolved path, size and mtime: what per-snapshot caches are keyed on."""
+    st = path.stat()
+    return [str(path.resolve()), st.st_size, st.st_mtime_ns]
+
+
+@contextmanager
+def build(live: Path):
+    """Yield a fresh snapshot path; publish it on success, discard it on error."""
+    snap = begin(live)
+    try:
+        yield snap
+    except BaseException:
+        discard(snap)
+        raise
+    publish(live, snap)
@@ -0,0 +1,64 @@
+"""Per-stage wall time, bytes and rows for one dataset refresh.
+
+``stage_*`` and ``ingest`` wrap each step — download, extract, sniff,
+ingest, typed/cluster rewrites, index build, row count — in
+``Timings.stage``.  The records travel with the ``Staged`` result and are
+appended to ``etl_runs`` in the snapshot being built, so a slow week can be
+compared with the last one::
+
+    SELECT run_id, dataset, stage, sum(seconds), sum(bytes) / sum(seconds) / 2**20 AS mb_per_s
+    FROM etl_runs GROUP BY ALL ORDER BY run_id DESC
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .settings import log
+
+RUNS_DDL = """
+CREATE TABLE IF NOT EXISTS etl_runs (
+    run_id      VARCHAR,
+    dataset     VARCHAR,
+    table_name  VARCHAR,
+    stage       VARCHAR,
+    started_at  TIMESTAMP,
+    seconds     DOUBLE,
+    bytes       BIGINT,
+    rows        BIGINT
+)
+"""
+
+
+class Timings:
+    def __init__(self, dataset: str):
+        self.dataset = dataset
+        self.records: list[dict] = []
+
+    @contextmanager
+    def stage(self, stage: str, table: str | None = None, nbytes: int | None = None):
+        """Time the block; set ``rec["rows"]`` / ``rec["bytes"]`` inside it if known."""
+        rec = {"table_name": table, "stage": stage, "started_at": datetime.now(), "bytes": nbytes, "rows": None}
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = time.perf_counter() - t0
+            self.records.append(rec)
+
+    def totals(self) -> dict[str, float]:
+        out: dict[str, float] = {}
+        for r in self.records:
+            out[r["stage"]] = out.get(r["stage"], 0.0) + r["seconds"]
+        return out
+
+    def record(self, con, run_id: str):
+        """Append this dataset's records to ``etl_runs`` and log a one-line summary."""
+        con.execute(RUNS_DDL)
+        if self.records:
+            con.executemany(
+                "INSERT INTO etl_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, self.dataset, r["table_name"], r["stage"], r["started_at"],
+                  r["seconds"], r["bytes"], r["rows"]) for r in self.records],
+            )
+        log.info(f"⏱️  [{self.dataset}] " + ", ".join(f"{k} {v:,.1f}s" for k, v in self.totals().items()))
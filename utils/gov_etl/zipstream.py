@@ -0,0 +1,77 @@
+"""Read CSV members straight out of (possibly nested) zip archives.
+
+Nested zips are opened from an in-memory copy of their bytes, so nothing is
+ever extracted to disk.  ``ZipMember.path`` mirrors the layout
+``unzip_recursive`` would have produced, which keeps table naming identical
+between the on-disk and streaming ingest modes.
+"""
+
+import io
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Iterator, NamedTuple
+
+
+class ZipMember(NamedTuple):
+    archive: Path
+    chain: tuple[str, ...]   # nested zip names, outermost first
+    name: str                # member name inside the innermost archive
+    size: int                # uncompressed bytes
+    crc: int
+
+    @property
+    def path(self) -> PurePosixPath:
+        """Where ``unzip_recursive`` would have put this file."""
+        dirs = [str(PurePosixPath(c).with_suffix('')) for c in self.chain]
+        return PurePosixPath(*dirs, self.name)
+
+
+def _walk(z: zipfile.ZipFile, archive: Path, chain: tuple[str, ...]) -> Iterator[ZipMember]:
+    for info in z.infolist():
+        if info.is_dir():
+            continue
+        if info.filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(z.read(info))) as inner:
+                yield from _walk(inner, archive, chain + (info.filename,))
+        else:
+            yield ZipMember(archive, chain, info.filename, info.file_size, info.CRC)
+
+
+def list_zip_members(archive: Path) -> list[ZipMember]:
+    """Every non-zip file in ``archive``, descending into nested zips."""
+    with zipfile.ZipFile(archive) as z:
+        return list(_walk(z, archive, ()))
+
+
+class ZipSource:
+    """Opens members of one archive, keeping the last nested zip in memory.
+
+    Members of a table usually share a nested zip, so reading them in order
+    only pulls each inner archive into memory once.
+    """
+
+    def __init__(self, archive: Path):
+        self._outer = zipfile.ZipFile(archive)
+        self._chain: tuple[str, ...] = ()
+        self._inner = self._outer
+
+    def open(self, m: ZipMember) -> IO[bytes]:
+        if m.chain != self._chain:
+            if self._inner is not self._outer:
+                self._inner.close()
+            z = self._outer
+            for name in m.chain:
+                z = zipfile.ZipFile(io.BytesIO(z.read(name)))
+            self._chain, self._inner = m.chain, z
+        return self._inner.open(m.name)
+
+    def close(self):
+        if self._inner is not self._outer:
+            self._inner.close()
+        self._outer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()